@@ -0,0 +1,52 @@
+import argparse
+import json
+import sys
+
+from fourthand1.cards import load_deck
+from fourthand1.play.balance import STATS, LayoutEvaluator, optimize
+from fourthand1.play.incremental import card_stats
+from fourthand1.play.matchups import MatchupTable
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Search for a defense card layout with the given stats against the offense deck.")
+    for stat in STATS:
+        parser.add_argument(f"--{stat.replace('_', '-')}", type=float, help=f"Target {stat.replace('_', ' ')}.")
+    parser.add_argument("--free", action="store_true", help="Leave stats without a target free, rather than holding them to the defense deck's.")
+    parser.add_argument("--tacklers", type=int, default=10)
+    parser.add_argument("--fumblers", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=64, help="Layouts tried at each step.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--id", default="CUSTOM")
+    parser.add_argument("--name", default="Custom")
+    parser.add_argument("--description", default="")
+    parser.add_argument("--output", help="Write the card here, rather than to stdout.")
+
+    return vars(parser.parse_args())
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    off_cards, def_cards = load_deck()
+
+    targets = {stat: args[stat] for stat in STATS if args[stat] is not None}
+    if not args["free"]:
+        deck_stats = card_stats(MatchupTable.create(off_cards, def_cards).contacts)
+        targets = {**deck_stats, **targets}
+
+    result = optimize(
+        targets, args["tacklers"], args["fumblers"], args["iterations"], args["batch"], args["seed"], LayoutEvaluator(off_cards),
+        card_id=args["id"], name=args["name"], description=args["description"])
+
+    print(f"Tried {result.evaluated} layouts in {result.seconds:.1f}s ({result.evaluated / result.seconds:.0f}/s)", file=sys.stderr)
+    for stat in STATS:
+        target = f" (target {targets[stat]:.3f})" if stat in targets else ""
+        print(f"{stat:>12}: {result.stats[stat]:.3f}{target}", file=sys.stderr)
+
+    card_json = json.dumps(result.card.asjson(), indent=4)
+    if args["output"]:
+        with open(args["output"], "w") as card_file:
+            card_file.write(card_json + "\n")
+    else:
+        print(card_json)
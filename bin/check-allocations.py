@@ -0,0 +1,43 @@
+import argparse
+import sys
+
+from fourthand1.cards import load_deck
+from fourthand1.memory import AllocationTracker, track_games
+
+
+# Budgets are in bytes, averaged over every call of an action. "peak" is the
+# most an action has allocated at once, garbage included, and "retained" is
+# what's left once it returns.
+PEAK_BUDGET = 4096
+RETAINED_BUDGET = 1024
+FOOTPRINT_BUDGET = 16384
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--plays-per-quarter", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget, e.g. for other Python versions.")
+
+    return vars(parser.parse_args())
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    with AllocationTracker() as tracker:
+        track_games(tracker, args["games"], args["plays_per_quarter"], load_deck(), args["seed"])
+    tracker.print_report()
+
+    failures = []
+    for action, allocations in sorted(tracker.actions.items()):
+        if allocations.mean_peak > PEAK_BUDGET * args["scale"]:
+            failures.append(f"{action} peaks at {allocations.mean_peak:.0f}B per call, over its {PEAK_BUDGET * args['scale']:.0f}B budget.")
+        if allocations.mean_retained > RETAINED_BUDGET * args["scale"]:
+            failures.append(f"{action} retains {allocations.mean_retained:.0f}B per call, over its {RETAINED_BUDGET * args['scale']:.0f}B budget.")
+    if tracker.steady_footprint > FOOTPRINT_BUDGET * args["scale"]:
+        failures.append(f"A game session takes {tracker.steady_footprint:.0f}B, over its {FOOTPRINT_BUDGET * args['scale']:.0f}B budget.")
+
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
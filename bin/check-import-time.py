@@ -0,0 +1,64 @@
+import argparse
+import subprocess
+import sys
+from os.path import abspath, dirname
+
+
+# Modules that each import must not load. Everything fourthand1 needs from
+# these is imported on first use, so loading them at import is a regression
+# in import time that doesn't depend on how fast the machine is.
+HEAVY_MODULES = ("json", "re", "enum", "glob", "contextlib", "functools", "typing", "dataclasses")
+
+FORBIDDEN = {
+    "fourthand1": ("fourthand1.cards", "fourthand1.events", "fourthand1.game", "fourthand1.rules"),
+    "fourthand1.cards": ("fourthand1.events", "fourthand1.game", "fourthand1.rules"),
+    "fourthand1.events": ("fourthand1.game", "fourthand1.rules"),
+    "fourthand1.game": ()
+}
+
+# Run without site, so that nothing but the import itself loads modules.
+_IMPORT = """
+import sys
+sys.path.insert(0, {root!r})
+before = set(sys.modules)
+import {module}
+print(" ".join(sorted(set(sys.modules) - before)))
+events = sys.modules.get("fourthand1.events")
+print(len(events._EventFactory.__subclasses__()) if events else 0)
+"""
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check what importing the package and its core modules loads.")
+    parser.add_argument("--verbose", action="store_true", help="List the modules each import loads.")
+
+    return vars(parser.parse_args())
+
+def imported_modules(module):
+    root = dirname(dirname(abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, "-S", "-c", _IMPORT.format(root=root, module=module)],
+        check=True, capture_output=True, text=True).stdout.splitlines()
+    return set(output[0].split()), int(output[1])
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    failures = []
+    for module, forbidden in FORBIDDEN.items():
+        modules, factory_types = imported_modules(module)
+        print(f"{module}: {len(modules)} modules loaded.")
+        if args["verbose"]:
+            print(f"  {' '.join(sorted(modules))}")
+
+        for forbidden_module in HEAVY_MODULES + forbidden:
+            if forbidden_module in modules:
+                failures.append(f"Importing {module} also imported {forbidden_module}.")
+        # The outcome tables, and the factory types in them, wait for the
+        # first Ruleset.
+        if factory_types:
+            failures.append(f"Importing {module} created {factory_types} event factory types.")
+
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,108 @@
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from os.path import dirname
+
+import fourthand1
+from fourthand1.cards import load_deck
+from fourthand1.events import use_dice
+from fourthand1.play import Play
+from fourthand1.play.matchups import OFFSETS
+from fourthand1.shared import SharedTables
+
+
+# Attaches to the block, plays a few plays and exits, as a worker would.
+_WORKER = """
+import sys
+from fourthand1.shared import SharedTables
+
+tables = SharedTables.attach(sys.argv[1])
+for off_index in range(len(tables.matchups.off_cards)):
+    tables.play(off_index, 0).run(50)
+tables.close()
+"""
+
+# Creates a block, has workers (both separate interpreters, with their own
+# resource tracker, and multiprocessing ones, sharing this one's) attach and
+# exit, then checks it can still be attached before unlinking it.
+_LIFECYCLE = """
+import multiprocessing
+import subprocess
+import sys
+from fourthand1.cards import load_deck
+from fourthand1.play.matchups import MatchupTable
+from fourthand1.shared import SharedTables
+
+def worker(name):
+    tables = SharedTables.attach(name)
+    tables.play(0, 0).run(50)
+    tables.close()
+
+if __name__ == "__main__":
+    off_cards, def_cards = load_deck()
+    with SharedTables.create(MatchupTable.create(off_cards[:2], def_cards[:1])) as tables:
+        for k in range(2):
+            subprocess.run([sys.executable, "-c", sys.argv[1], tables.name], check=True)
+        with multiprocessing.get_context("spawn").Pool(2) as pool:
+            pool.map(worker, [tables.name] * 4)
+        SharedTables.attach(tables.name).close()
+"""
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check that plays from SharedTables match plays from the cards.")
+    parser.add_argument("--ydlines", type=int, nargs="+", default=[5, 35, 65, 95])
+    parser.add_argument("--seeds", type=int, default=3, help="Dice seeds to run each matchup with.")
+
+    return vars(parser.parse_args())
+
+def play_events(play, ydline, seed):
+    rng = random.Random(seed)
+    with use_dice(lambda slot: sum(rng.randint(1, 6) for k in range(3))):
+        result = play.run(ydline)
+    return [event.asjson() for event in result.resolve()]
+
+def compare_plays(tables, off_cards, def_cards, ydlines, seeds):
+    mismatches = []
+    for off_index, off_card in enumerate(off_cards):
+        for def_index, def_card in enumerate(def_cards):
+            for off_offset in OFFSETS:
+                for def_offset in OFFSETS:
+                    play = Play.create(off_card, def_card, off_offset, def_offset)
+                    shared_play = tables.play(off_index, def_index, off_offset, def_offset)
+                    for ydline in ydlines:
+                        for seed in range(seeds):
+                            if play_events(play, ydline, seed) != play_events(shared_play, ydline, seed):
+                                mismatches.append((off_card.id, def_card.id, off_offset, def_offset, ydline, seed))
+    return mismatches
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    off_cards, def_cards = load_deck()
+
+    failures = []
+    with SharedTables.create() as tables:
+        mismatches = compare_plays(tables, off_cards, def_cards, args["ydlines"], args["seeds"])
+    print(f"Compared {len(off_cards) * len(def_cards) * len(OFFSETS) ** 2} matchups: {len(mismatches)} mismatched.")
+    for off_card_id, def_card_id, off_offset, def_offset, ydline, seed in mismatches[:10]:
+        failures.append(f"{off_card_id} ({off_offset:+}) vs {def_card_id} ({def_offset:+}) from {ydline}, seed {seed}: events differ.")
+
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([dirname(dirname(fourthand1.__file__)), os.environ.get("PYTHONPATH", "")])}
+    # Spawned workers need the parent's code in a file.
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        lifecycle_path = os.path.join(tmp_dir, "lifecycle.py")
+        with open(lifecycle_path, "w") as lifecycle_file:
+            lifecycle_file.write(_LIFECYCLE)
+        lifecycle = subprocess.run([sys.executable, lifecycle_path, _WORKER], env=env, capture_output=True, text=True)
+    print(f"Worker attach and exit: {'ok' if lifecycle.returncode == 0 and not lifecycle.stderr else 'failed'}.")
+    if lifecycle.returncode:
+        failures.append(f"The block didn't survive its workers exiting:\n{lifecycle.stderr}")
+    elif lifecycle.stderr:
+        failures.append(f"Workers attaching and exiting wrote to stderr:\n{lifecycle.stderr}")
+
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
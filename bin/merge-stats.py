@@ -0,0 +1,24 @@
+import argparse
+
+from fourthand1.stats import StatsShard
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("output_file")
+    parser.add_argument("shard_files", nargs="+")
+
+    return vars(parser.parse_args())
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    # Shards are folded in one at a time, so only a single shard is ever held
+    # in memory alongside the running total.
+    merged = StatsShard()
+    for shard_filepath in args["shard_files"]:
+        merged.update(StatsShard.load(shard_filepath))
+
+    merged.dump(args["output_file"])
+    print(f"Merged {len(args['shard_files'])} shards covering {merged.games} games.")
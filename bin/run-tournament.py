@@ -0,0 +1,40 @@
+import argparse
+import importlib
+import json
+
+from fourthand1.tournament import Tournament
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("entrants", nargs="+", help="Entrants as name=module:PolicyClass, e.g. random=fourthand1.policies:RandomPolicy.")
+    parser.add_argument("--format", choices=("round-robin", "swiss"), default="round-robin")
+    parser.add_argument("--rounds", type=int, default=5, help="Rounds to play, for Swiss.")
+    parser.add_argument("--max-games", type=int, default=100, help="Most games per pairing.")
+    parser.add_argument("--min-games", type=int, default=10, help="Fewest games per pairing before it can be settled early.")
+    parser.add_argument("--plays-per-quarter", type=int, default=15)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+
+    return vars(parser.parse_args())
+
+def load_factory(spec):
+    module_name, factory_name = spec.split(":")
+    return getattr(importlib.import_module(module_name), factory_name)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    tournament = Tournament(args["plays_per_quarter"], args["workers"], args["seed"])
+    for entrant in args["entrants"]:
+        name, spec = entrant.split("=", 1)
+        tournament.register(name, load_factory(spec))
+
+    if args["format"] == "round-robin":
+        tournament.round_robin(args["max_games"], args["min_games"])
+    else:
+        tournament.swiss(args["rounds"], args["max_games"], args["min_games"])
+
+    print(json.dumps([standing.asjson() for standing in tournament.ranking()], indent=4))
+    print(f"{len(tournament.results)} games played.")
@@ -0,0 +1,194 @@
+import argparse
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os.path import dirname, join
+from urllib.parse import parse_qs, urlsplit
+
+from fourthand1.cards import CARDS_DIR, load_deck
+from fourthand1.play import Play
+from fourthand1.play.matchups import OFFSETS
+
+
+TEMPLATE_PATH = join(dirname(__file__), "template.html")
+
+
+# Renders cards the way paint-card.py does, into the template, from a deck
+# loaded once up front. The version is a hash of the deck and the template,
+# so that pages rendered from different data never share an ETag.
+class CardRenderer:
+    def __init__(self, cards_dir=CARDS_DIR):
+        off_cards, def_cards = load_deck(cards_dir)
+        self.off_cards = {card.id: card for card in off_cards}
+        self.def_cards = {card.id: card for card in def_cards}
+        with open(TEMPLATE_PATH) as template_file:
+            self.template = template_file.read()
+
+        version = hashlib.sha1(self.template.encode("utf-8"))
+        for card in off_cards + def_cards:
+            version.update(json.dumps(card.asjson(), sort_keys=True).encode("utf-8"))
+        self.version = version.hexdigest()
+
+    # A page's ETag only depends on what it shows and the data it's rendered
+    # from, so it's known without rendering the page.
+    def etag(self, key):
+        digest = hashlib.sha1(f"{self.version}/{key!r}".encode("utf-8")).hexdigest()
+        return f"\"{digest}\""
+
+    # As in paint-card.py, offsets only apply to matchups; a card on its own
+    # is drawn as it is in its file.
+    def render(self, off_card_id=None, def_card_id=None, off_offset=0, def_offset=0):
+        off_card_json, def_card_json = "", ""
+        if off_card_id is not None and def_card_id is not None:
+            play = Play.create(self.off_cards[off_card_id], self.def_cards[def_card_id], off_offset, def_offset)
+            off_card_json, def_card_json = play.off_play.asjson(), play.def_play.asjson()
+        elif off_card_id is not None:
+            off_card_json = self.off_cards[off_card_id].asjson()
+        elif def_card_id is not None:
+            def_card_json = self.def_cards[def_card_id].asjson()
+
+        return self.template \
+            .replace("\"\";//{{OFFENSE_CARD_JSON}}", f"{json.dumps(off_card_json)};") \
+            .replace("\"\";//{{DEFENSE_CARD_JSON}}", f"{json.dumps(def_card_json)};") \
+            .encode("utf-8")
+
+
+# Rendered pages by (offense card id, defense card id, offsets), with either
+# card id None for a single card. Holds the `capacity` most recently used, and
+# is safe to share between the server's threads.
+class RenderCache:
+    def __init__(self, renderer, capacity=512):
+        self.renderer = renderer
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return page
+            self.misses += 1
+
+        page = self.renderer.render(*key)
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.capacity:
+                self._pages.popitem(last=False)
+        return page
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._pages), "capacity": self.capacity, "hits": self.hits, "misses": self.misses}
+
+
+# GET /offense/<card id>
+# GET /defense/<card id>
+# GET /matchup/<offense card id>/<defense card id>?off_offset=N&def_offset=N
+# GET /cards, for the ids of every card, and /stats, for the cache's counts
+class CardHandler(BaseHTTPRequestHandler):
+    cache = None
+
+    def _offset(self, query, name):
+        value = query.get(name, ["0"])[-1]
+        try:
+            offset = int(value)
+        except ValueError:
+            offset = None
+        if offset not in OFFSETS:
+            raise ValueError(f"{name} must be one of {', '.join(str(offset) for offset in OFFSETS)}, not {value}")
+        return offset
+
+    def _key(self, parts, query):
+        renderer = self.cache.renderer
+        if len(parts) == 2 and parts[0] == "offense" and parts[1] in renderer.off_cards:
+            return (parts[1], None, 0, 0)
+        elif len(parts) == 2 and parts[0] == "defense" and parts[1] in renderer.def_cards:
+            return (None, parts[1], 0, 0)
+        elif len(parts) == 3 and parts[0] == "matchup" and parts[1] in renderer.off_cards and parts[2] in renderer.def_cards:
+            return (parts[1], parts[2], self._offset(query, "off_offset"), self._offset(query, "def_offset"))
+        return None
+
+    # Whether If-None-Match names the ETag. Weak tags (W/"...") match their
+    # strong form, since pages only change when their ETag does, and "*"
+    # matches any page.
+    def _not_modified(self, etag):
+        for tag in self.headers.get("If-None-Match", "").split(","):
+            tag = tag.strip()
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag in ("*", etag):
+                return True
+        return False
+
+    def _send(self, status, body=b"", content_type="text/plain; charset=utf-8", etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.wfile.write(body)
+
+    def _send_json(self, value):
+        self._send(HTTPStatus.OK, json.dumps(value).encode("utf-8"), "application/json")
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = parse_qs(url.query)
+
+        if parts == ["cards"]:
+            renderer = self.cache.renderer
+            return self._send_json({"offense": list(renderer.off_cards), "defense": list(renderer.def_cards)})
+        elif parts == ["stats"]:
+            return self._send_json(self.cache.stats())
+
+        try:
+            key = self._key(parts, query)
+        except ValueError as exc:
+            return self._send(HTTPStatus.BAD_REQUEST, f"{exc}\n".encode("utf-8"))
+        if key is None:
+            return self._send(HTTPStatus.NOT_FOUND, b"No such card or view.\n")
+
+        # Revalidating a page the client already has never renders it, or
+        # touches the cache.
+        etag = self.cache.renderer.etag(key)
+        if self._not_modified(etag):
+            return self._send(HTTPStatus.NOT_MODIFIED, etag=etag)
+        self._send(HTTPStatus.OK, self.cache.get(key), "text/html; charset=utf-8", etag)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve card diagrams over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--cards-dir", default=CARDS_DIR)
+    parser.add_argument("--cache-size", type=int, default=512, help="How many rendered pages to keep.")
+
+    return vars(parser.parse_args())
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    CardHandler.cache = RenderCache(CardRenderer(args["cards_dir"]), args["cache_size"])
+    server = ThreadingHTTPServer((args["host"], args["port"]), CardHandler)
+    print(f"Serving cards on http://{args['host']}:{args['port']}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,42 @@
+import argparse
+import sys
+import time
+
+from fourthand1.cards import CARDS_DIR
+from fourthand1.play.incremental import IncrementalMatchups
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards-dir", default=CARDS_DIR)
+    parser.add_argument("--interval", type=float, default=0.25, help="Seconds between checks for changed cards.")
+
+    return vars(parser.parse_args())
+
+def _print_stats(title, stats):
+    print(f"{title:<8} {'TD':>6} {'tackle':>7} {'fumble':>7} {'int':>6} {'inc':>6} {'yds':>6}")
+    for card_id, card_stats in stats.items():
+        mean_yds = "-" if card_stats["mean_yds"] is None else f"{card_stats['mean_yds']:.1f}"
+        print(
+            f"{card_id:<8} {card_stats['touchdown']:>6.1%} {card_stats['tackle']:>7.1%} {card_stats['fumble']:>7.1%} "
+            f"{card_stats['interception']:>6.1%} {card_stats['incomplete']:>6.1%} {mean_yds:>6}")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    matchups = IncrementalMatchups(args["cards_dir"])
+
+    def _report(changed):
+        off_stats, def_stats = matchups.stats()
+        _print_stats("Offense", off_stats)
+        _print_stats("Defense", def_stats)
+        print(f"Updated {', '.join(sorted(changed))} at {time.strftime('%H:%M:%S')}.\n", flush=True)
+
+    def _report_error(exc):
+        print(f"Couldn't load the cards: {exc!r}", file=sys.stderr, flush=True)
+
+    try:
+        matchups.watch(_report, _report_error, args["interval"])
+    except KeyboardInterrupt:
+        pass
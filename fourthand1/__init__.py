@@ -0,0 +1,23 @@
+import importlib
+
+
+# Importing the package itself is kept cheap; the modules behind these names
+# (and the events they pull in) are only imported the first time one is used.
+_LAZY_ATTRS = {
+    "Game": "fourthand1.game",
+    "Team": "fourthand1.game",
+    "Ruleset": "fourthand1.rules",
+    "Play": "fourthand1.play",
+    "load_deck": "fourthand1.cards"
+}
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_LAZY_ATTRS[name]), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
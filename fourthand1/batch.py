@@ -0,0 +1,272 @@
+import numpy as np
+
+from fourthand1.cards import load_deck
+from fourthand1.events import PlayResult
+from fourthand1.game import PHASES
+from fourthand1.outcomes import SETUPS, OutcomeTables
+from fourthand1.play.matchups import MatchupTable
+from fourthand1.rules import Ruleset
+
+
+ACTIONS = ("kickoff", "onside", "safety_punt", "play", "punt_in_bounds", "punt_out_of_bounds", "field_goal")
+
+_PHASE = {phase: code for code, phase in enumerate(PHASES)}
+_ACTION = {action: code for code, action in enumerate(ACTIONS)}
+_SETUP = {setup: code for code, setup in enumerate(SETUPS)}
+_CONTACT = {contact: code for code, contact in enumerate(PlayResult.CONTACTS)}
+
+_KICKOFF_PHASES = [_PHASE["coin-flip-result"], _PHASE["halftime"], _PHASE["kickoff"]]
+_DONE_PHASES = [_PHASE["overtime"], _PHASE["gameover"]]
+
+# Blocked kicks and penalties can leave the ball outside the field, so the
+# tables cover well beyond it.
+_YDLINE_MIN = -100
+_YDLINE_SPAN = 301
+
+
+# Plays many games in lockstep, with the state of every game held in arrays.
+# Instead of creating events, each action samples from the exact distribution
+# of what it does to the game (see fourthand1.outcomes), and only the
+# bookkeeping the Game setup methods do is repeated here, across all games at
+# once. Distributions are compiled into the sampling tables the first time a
+# situation comes up.
+#
+# Actions are given as codes into ACTIONS. For "play", the row also carries
+# the offense card index, defense card index, offense offset and defense
+# offset, so step() takes either an (N, ) array or an (N, 5) array.
+class BatchGame:
+    def __init__(self, num_games, plays_per_quarter, rules=None, matchups=None, seed=None, outcomes=None):
+        self.num_games = num_games
+        self.plays_per_quarter = plays_per_quarter
+        self.rules = rules or Ruleset.default()
+        self.matchups = matchups or MatchupTable.create(*load_deck())
+        self.outcomes = outcomes or OutcomeTables.for_rules(self.rules)
+        self._rng = np.random.default_rng(seed)
+
+        self._contacts = np.array([_CONTACT[contact] for contact, yds in self.matchups.contacts], dtype=np.int8)
+        self._contact_yds = np.array([yds or 0 for contact, yds in self.matchups.contacts], dtype=np.int16)
+
+        self.effects = []
+        self._effect_ids = {}
+        self._effect_arrays = None
+        self._dist_rows = []
+        self._dist_tables = None
+        self._special_teams_rows = np.full((len(ACTIONS), _YDLINE_SPAN), -1, dtype=np.int32)
+        self._play_rows = np.full((len(PlayResult.CONTACTS), _YDLINE_SPAN), -1, dtype=np.int32)
+
+        self.phase = np.zeros(num_games, dtype=np.int8)
+        self.quarter = np.zeros(num_games, dtype=np.int8)
+        self.playnum = np.zeros(num_games, dtype=np.int16)
+        self.ydline = np.zeros(num_games, dtype=np.int16)
+        self.down = np.zeros(num_games, dtype=np.int8)
+        self.first_down_ydline = np.zeros(num_games, dtype=np.int16)
+        self.possession = np.zeros(num_games, dtype=np.int8)
+        self.scores = np.zeros((num_games, 2), dtype=np.int16)
+
+        self.reset()
+
+    @property
+    def dones(self):
+        return np.isin(self.phase, _DONE_PHASES)
+
+    def observation(self):
+        return {
+            "phase": self.phase.copy(),
+            "quarter": self.quarter.copy(),
+            "playnum": self.playnum.copy(),
+            "ydline": self.ydline.copy(),
+            "down": self.down.copy(),
+            "first_down_ydline": self.first_down_ydline.copy(),
+            "possession": self.possession.copy(),
+            "scores": self.scores.copy()
+        }
+
+    def action_mask(self):
+        mask = np.zeros((self.num_games, len(ACTIONS)), dtype=bool)
+
+        kickoff = np.isin(self.phase, _KICKOFF_PHASES)
+        mask[:, _ACTION["kickoff"]] = kickoff
+        mask[:, _ACTION["onside"]] = kickoff
+
+        mask[:, _ACTION["safety_punt"]] = self.phase == _PHASE["safety"]
+
+        play_selection = self.phase == _PHASE["play-selection"]
+        mask[:, _ACTION["play"]] = play_selection
+        mask[:, _ACTION["punt_in_bounds"]] = play_selection
+        mask[:, _ACTION["punt_out_of_bounds"]] = play_selection
+        mask[:, _ACTION["field_goal"]] = play_selection & (self.ydline >= self.rules.field_goal_min_ydline)
+        return mask
+
+    def reset(self, mask=None):
+        rows = np.arange(self.num_games) if mask is None else np.nonzero(mask)[0]
+
+        self.quarter[rows] = 1
+        self.playnum[rows] = 0
+        self.scores[rows] = 0
+
+        # The coin flip, then the kick-off set up for whoever won it.
+        self.possession[rows] = self._rng.integers(0, 2, len(rows))
+        self._setup_kickoff(rows)
+        self.phase[rows] = _PHASE["coin-flip-result"]
+
+        return self.observation()
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        if actions.ndim == 1:
+            actions = actions[:, None]
+        codes = actions[:, 0]
+
+        active = ~self.dones
+        valid = self.action_mask()[np.arange(self.num_games), codes]
+        invalid = np.nonzero(active & ~valid)[0]
+        if len(invalid):
+            index = invalid[0]
+            raise ValueError(f"Game {index} can't take {ACTIONS[codes[index]]} during {PHASES[self.phase[index]]}.")
+
+        rows = np.nonzero(active)[0]
+        effect_ids = np.full(self.num_games, -1, dtype=np.int32)
+        for code, action in enumerate(ACTIONS):
+            action_rows = rows[codes[rows] == code]
+            if not len(action_rows):
+                continue
+
+            if action == "play":
+                dist_rows = self._play_dist_rows(actions[action_rows, 1:5], self.ydline[action_rows])
+            else:
+                dist_rows = self._special_teams_dist_rows(action, self.ydline[action_rows])
+            effect_ids[action_rows] = self._sample(dist_rows)
+
+        scores_before = self.scores.copy()
+        self._apply(rows, effect_ids[rows])
+        self._advance_playcounter(rows)
+
+        rewards = self.scores - scores_before
+        return self.observation(), rewards, self.dones, {"effects": effect_ids}
+
+    def effect_types(self, effect_id):
+        return self.effects[effect_id].types
+
+    def _dist_row(self, dist):
+        ids, probs = [], []
+        for effect, prob in dist.items():
+            if effect not in self._effect_ids:
+                self._effect_ids[effect] = len(self.effects)
+                self.effects.append(effect)
+                self._effect_arrays = None
+            ids.append(self._effect_ids[effect])
+            probs.append(prob)
+
+        cdf = np.cumsum(probs)
+        cdf[-1] = 1.0
+        self._dist_rows.append((cdf, np.array(ids, dtype=np.int32)))
+        self._dist_tables = None
+        return len(self._dist_rows) - 1
+
+    def _special_teams_dist_rows(self, action, ydlines):
+        code = _ACTION[action]
+        indices = ydlines - _YDLINE_MIN
+        for index in np.unique(indices[self._special_teams_rows[code, indices] < 0]):
+            dist = self.outcomes.special_teams(action, int(index) + _YDLINE_MIN)
+            self._special_teams_rows[code, index] = self._dist_row(dist)
+        return self._special_teams_rows[code, indices]
+
+    def _play_dist_rows(self, plays, ydlines):
+        matchups = self.matchups.index(plays[:, 0], plays[:, 1], plays[:, 2], plays[:, 3])
+        contacts = self._contacts[matchups]
+        play_ends = np.where(contacts == _CONTACT["touchdown"], 100, ydlines + self._contact_yds[matchups])
+
+        indices = play_ends - _YDLINE_MIN
+        missing = self._play_rows[contacts, indices] < 0
+        for contact, index in set(zip(contacts[missing].tolist(), indices[missing].tolist())):
+            dist = self.outcomes.play(PlayResult.CONTACTS[contact], index + _YDLINE_MIN)
+            self._play_rows[contact, index] = self._dist_row(dist)
+        return self._play_rows[contacts, indices]
+
+    def _sample(self, dist_rows):
+        if self._dist_tables is None:
+            width = max(len(ids) for cdf, ids in self._dist_rows)
+            cdfs = np.ones((len(self._dist_rows), width))
+            ids = np.zeros((len(self._dist_rows), width), dtype=np.int32)
+            for row, (row_cdf, row_ids) in enumerate(self._dist_rows):
+                cdfs[row, :len(row_cdf)] = row_cdf
+                ids[row, :len(row_ids)] = row_ids
+                ids[row, len(row_ids):] = row_ids[-1]
+            self._dist_tables = cdfs, ids
+
+        cdfs, ids = self._dist_tables
+        rolls = self._rng.random(len(dist_rows))
+        picks = (cdfs[dist_rows] < rolls[:, None]).sum(axis=1)
+        return ids[dist_rows, picks]
+
+    def _effects(self, effect_ids):
+        if self._effect_arrays is None:
+            self._effect_arrays = tuple(np.array(values) for values in zip(*(
+                (_SETUP[effect.setup], effect.ydline, effect.keeps_ball, effect.points, effect.opp_points)
+                for effect in self.effects)))
+        return tuple(values[effect_ids] for values in self._effect_arrays)
+
+    def _apply(self, rows, effect_ids):
+        setups, ydlines, keeps_ball, points, opp_points = self._effects(effect_ids)
+
+        actor = self.possession[rows]
+        self.scores[rows, actor] += points
+        self.scores[rows, 1 - actor] += opp_points
+        self.possession[rows] = np.where(keeps_ball, actor, 1 - actor)
+
+        next_play = setups == _SETUP["next_play"]
+        self._setup_next_play(rows[next_play], ydlines[next_play])
+
+        drive = setups == _SETUP["drive"]
+        self._setup_drive(rows[drive], ydlines[drive])
+
+        self._setup_kickoff(rows[setups == _SETUP["kickoff"]])
+
+        safety_punt = rows[setups == _SETUP["safety_punt"]]
+        self._clear_downs(safety_punt)
+        self.phase[safety_punt] = _PHASE["safety"]
+        self.ydline[safety_punt] = 20
+
+    def _clear_downs(self, rows):
+        self.down[rows] = 0
+        self.first_down_ydline[rows] = 0
+
+    def _setup_kickoff(self, rows):
+        self._clear_downs(rows)
+        self.phase[rows] = _PHASE["kickoff"]
+        self.ydline[rows] = 40
+
+    def _setup_drive(self, rows, ydlines):
+        self.phase[rows] = _PHASE["play-selection"]
+        self.ydline[rows] = ydlines
+        self.down[rows] = 1
+        self.first_down_ydline[rows] = ydlines + 10
+
+    def _setup_next_play(self, rows, ydlines):
+        first_down = ydlines >= self.first_down_ydline[rows]
+        turnover = ~first_down & (self.down[rows] == 4)
+
+        self.phase[rows] = _PHASE["play-selection"]
+        self.ydline[rows] = ydlines
+        self.down[rows] += 1
+        self.down[rows[first_down]] = 1
+        self.first_down_ydline[rows[first_down]] = ydlines[first_down] + 10
+
+        # Turnover on downs.
+        turnover_rows = rows[turnover]
+        self.possession[turnover_rows] = 1 - self.possession[turnover_rows]
+        self._setup_drive(turnover_rows, 100 - ydlines[turnover])
+
+    def _advance_playcounter(self, rows):
+        self.playnum[rows] += 1
+        quarter_over = rows[self.playnum[rows] > self.plays_per_quarter]
+        self.playnum[quarter_over] = 1
+        self.quarter[quarter_over] += 1
+
+        halftime = quarter_over[self.quarter[quarter_over] == 3]
+        self._setup_kickoff(halftime)
+        self.phase[halftime] = _PHASE["halftime"]
+
+        final = quarter_over[self.quarter[quarter_over] == 5]
+        tied = self.scores[final, 0] == self.scores[final, 1]
+        self.phase[final] = np.where(tied, _PHASE["overtime"], _PHASE["gameover"])
@@ -0,0 +1,109 @@
+import asyncio
+from collections import deque, namedtuple
+
+from fourthand1.events.serialize import EventEncoder
+
+
+# "data" is a JSON array of the events of one action, the same bytes for
+# every subscriber. "seq" counts frames from 0, so subscribers can tell when
+# some were dropped.
+Frame = namedtuple("Frame", ("seq", "data"))
+
+
+class Subscription:
+    def __init__(self, broadcaster, max_frames):
+        self.broadcaster = broadcaster
+        self.max_frames = max_frames
+        self.dropped = 0
+        self.closed = False
+        self._frames = deque()
+        # Set when there's a frame to take or the subscription has ended, so a
+        # waiting get() wakes up for either.
+        self._ready = asyncio.Event()
+
+    def _put(self, frame):
+        # A subscriber that can't keep up loses its oldest frames rather than
+        # holding up everyone else, or growing without bound.
+        if len(self._frames) >= self.max_frames:
+            self._frames.popleft()
+            self.dropped += 1
+        self._frames.append(frame)
+        self._ready.set()
+
+    # No more frames will come. Ending doesn't take a slot in the queue, so
+    # it never pushes out a frame the subscriber hasn't read yet.
+    def _end(self):
+        self.closed = True
+        self._ready.set()
+
+    # Returns the next frame, or None once the broadcast is over (after the
+    # frames already queued) or the subscription is closed, and from then on.
+    async def get(self):
+        while not self._frames:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        return self._frames.popleft()
+
+    # Stops the subscription, dropping any frames not read yet. A get()
+    # waiting for a frame returns None.
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+        self._frames.clear()
+        self._end()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        frame = await self.get()
+        if frame is None:
+            raise StopAsyncIteration()
+        return frame
+
+
+# Fans the events of a game out to any number of spectators. Each batch of
+# events is serialized once, and every subscriber is handed the same bytes,
+# so adding a spectator costs a queue, not another round of serialization.
+# Everything has to happen on the event loop's thread.
+class Broadcaster:
+    def __init__(self, max_frames=64):
+        self.max_frames = max_frames
+        self.subscriptions = set()
+        self.closed = False
+        self._seq = 0
+        self._encoder = EventEncoder()
+
+    def subscribe(self, max_frames=None):
+        if self.closed:
+            raise ValueError("Can't subscribe to a broadcast that's over.")
+
+        subscription = Subscription(self, max_frames or self.max_frames)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+
+    def publish(self, events):
+        if self.closed:
+            raise ValueError("Can't publish to a broadcast that's over.")
+
+        frame = Frame(self._seq, self._encoder.dumps(events))
+        self._seq += 1
+        for subscription in self.subscriptions:
+            subscription._put(frame)
+        return frame
+
+    # Runs the action on the game and publishes its events.
+    def perform(self, game, action, *args):
+        events = getattr(game, action)(*args) or []
+        self.publish(events)
+        return events
+
+    def close(self):
+        self.closed = True
+        for subscription in self.subscriptions:
+            subscription._end()
+        self.subscriptions = set()
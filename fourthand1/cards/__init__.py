@@ -1,2 +1,18 @@
+import os
+from os.path import dirname, join
+
 from fourthand1.cards.offense import OffenseCard
 from fourthand1.cards.defense import DefenseCard
+
+
+CARDS_DIR = join(dirname(dirname(__file__)), "data", "cards")
+
+def _card_sort_key(card):
+    return tuple(int(part) if part.isdigit() else part for part in card.id.split("-"))
+
+def load_cards(card_cls, card_dir):
+    cards = [card_cls.load(join(card_dir, filename)) for filename in os.listdir(card_dir) if filename.endswith(".json")]
+    return sorted(cards, key=_card_sort_key)
+
+def load_deck(cards_dir=CARDS_DIR):
+    return load_cards(OffenseCard, join(cards_dir, "offense")), load_cards(DefenseCard, join(cards_dir, "defense"))
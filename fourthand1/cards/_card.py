@@ -1,9 +1,10 @@
-import json
-
-
 class Card:
     @staticmethod
     def load_json(filepath):
+        # Deferred so that code only needing the card classes (like the
+        # events) doesn't pay for importing json.
+        import json
+
         with open(filepath) as card_file:
             return json.load(card_file)
 
@@ -1,5 +1,4 @@
 import itertools
-import json
 
 from fourthand1.cards._card import Card
 
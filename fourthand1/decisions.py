@@ -0,0 +1,124 @@
+import json
+import os
+from collections import OrderedDict, namedtuple
+
+
+# Everything a play-calling decision is taken to depend on. The clock and the
+# score are bucketed, so that near enough situations share a decision: the
+# play number by PLAYNUM_BUCKET plays, and the ball carrier's lead to the
+# nearest SCORE_BUCKET points (a touchdown and its PAT), capped at MAX_LEAD
+# either way, so that leading and trailing by the same amount land the same
+# distance from 0. Down and distance are None outside of play selection. A
+# policy whose decisions don't depend on some of these can leave them out of
+# its keys (None), so that situations differing only in those share an entry.
+SituationKey = namedtuple("SituationKey", ("phase", "down", "distance", "ydline", "quarter", "playnum", "lead"))
+
+Decision = namedtuple("Decision", ("action", "value"))
+
+PLAYNUM_BUCKET = 5
+SCORE_BUCKET = 7
+MAX_LEAD = 21
+
+def situation_key(game):
+    distance = None if game.first_down_ydline is None else game.first_down_ydline - game.ydline
+
+    lead = 0
+    if game.ball_carrier:
+        lead = game.ball_carrier.score - game.opponent(game.ball_carrier).score
+    lead = max(-MAX_LEAD, min(MAX_LEAD, lead))
+
+    return SituationKey(game.phase, game.down, distance, game.ydline, game.quarter, game.playnum // PLAYNUM_BUCKET, round(lead / SCORE_BUCKET))
+
+
+# Keeps the last `capacity` decisions by situation, evicting the least
+# recently used. lookup() counts hits and misses, so the hit rate shows
+# whether the cache is big enough. A cache can be saved to a JSON file and
+# loaded again, so a bot starts warm after a restart.
+class DecisionCache:
+    VERSION = 1
+
+    @staticmethod
+    def load(path, capacity=4096):
+        cache = DecisionCache(capacity)
+        try:
+            with open(path) as cache_file:
+                contents = json.load(cache_file)
+        except FileNotFoundError:
+            return cache
+
+        if contents.get("version") != DecisionCache.VERSION:
+            raise ValueError(f"Unsupported decision cache version: {contents.get('version')}")
+        for key, action, value in contents["decisions"]:
+            cache.put(SituationKey(*key), Decision(action, value))
+        return cache
+
+    def __init__(self, capacity=4096):
+        if capacity < 1:
+            raise ValueError(f"A decision cache has to hold at least one decision, not {capacity}.")
+
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._decisions = OrderedDict()
+
+    def __len__(self):
+        return len(self._decisions)
+
+    def __contains__(self, key):
+        return key in self._decisions
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key):
+        decision = self._decisions.get(key)
+        if decision is not None:
+            self._decisions.move_to_end(key)
+        return decision
+
+    def put(self, key, decision):
+        self._decisions[key] = decision
+        self._decisions.move_to_end(key)
+        while len(self._decisions) > self.capacity:
+            self._decisions.popitem(last=False)
+            self.evictions += 1
+
+    # Returns the cached decision for the situation, or else decides it with
+    # decide() and caches that.
+    def lookup(self, key, decide):
+        decision = self.get(key)
+        if decision is not None:
+            self.hits += 1
+            return decision
+
+        self.misses += 1
+        decision = decide()
+        self.put(key, decision)
+        return decision
+
+    def clear(self):
+        self._decisions.clear()
+
+    # Written least recently used first, so loading it into a smaller cache
+    # keeps the most recent decisions.
+    def save(self, path):
+        contents = {
+            "version": DecisionCache.VERSION,
+            "decisions": [[list(key), decision.action, decision.value] for key, decision in self._decisions.items()]
+        }
+        with open(path + ".tmp", "w") as cache_file:
+            json.dump(contents, cache_file)
+        os.replace(path + ".tmp", path)
+
+    def stats(self):
+        return {
+            "size": len(self._decisions),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate
+        }
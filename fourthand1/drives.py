@@ -0,0 +1,187 @@
+import bisect
+import gzip
+import json
+import random
+from collections import namedtuple
+
+from fourthand1.cards import load_deck
+from fourthand1.game import Game
+from fourthand1.outcomes import OutcomeTables
+from fourthand1.play import Play
+from fourthand1.rules import Ruleset
+
+
+# How a drive ended, from the point of view of the offense, much like an
+# Effect (see fourthand1.outcomes): "plays" is how many actions it took
+# (the punt or field goal that ended it included), "setup" is what comes next
+# ("drive", "kickoff" or "safety_punt") and "ydline" is where the next drive
+# starts, for "drive". "keeps_ball" is whether the offense has the ball next
+# (it kicks off after scoring, say) and the points are those scored by each
+# side along the way.
+DriveOutcome = namedtuple("DriveOutcome", ("plays", "setup", "ydline", "keeps_ball", "points", "opp_points"))
+
+_SETUPS = {"play-selection": "drive", "kickoff": "kickoff", "safety": "safety_punt"}
+
+# The distribution of drive outcomes for one offense policy against one
+# defense policy, by the yard line the drive starts from. Each is estimated by
+# playing `samples` drives out snap by snap, the first time a drive starts
+# from there. Drives are played without a clock and with the score level, so
+# this only holds for policies that don't look at either.
+class DriveTables:
+    VERSION = 2
+
+    @staticmethod
+    def load(filepath, offense, defense, deck=None, rules=None):
+        with gzip.open(filepath, "rt") as tables_file:
+            tables_json = json.load(tables_file)
+        if tables_json.get("version") != DriveTables.VERSION:
+            raise ValueError(f"Unsupported drive tables version: {tables_json.get('version')}")
+
+        tables = DriveTables(offense, defense, tables_json["samples"], deck, rules)
+        for ydline, outcomes in tables_json["drives"].items():
+            tables._set(int(ydline), {DriveOutcome(*outcome): count for outcome, count in outcomes})
+        return tables
+
+    def __init__(self, offense, defense, samples=500, deck=None, rules=None, seed=0):
+        self.offense = offense
+        self.defense = defense
+        self.samples = samples
+        self.deck = deck or load_deck()
+        self.rules = rules or Ruleset.default()
+        self.seed = seed
+        self._counts = {}
+        self._outcomes = {}
+        self._cumulative = {}
+
+    def _play_drive(self, ydline, rng):
+        off_cards, def_cards = self.deck
+
+        # Far more plays per quarter than any drive takes, so the clock never
+        # gets in the way.
+        game = Game.create("offense", "defense", 1 << 30, self.rules, seed=rng.getrandbits(64))
+        offense = game.team1
+        game.ball_carrier = offense
+        game.ydline = 100 - ydline
+        game.setup_drive()
+
+        plays = 0
+        while True:
+            action = self.offense.action(game, rng)
+            if action not in game.action_names:
+                raise ValueError(f"The offense can't {action} during {game.phase}.")
+
+            if action == "play":
+                off_card, off_offset = self.offense.offense(game, off_cards, rng)
+                def_card, def_offset = self.defense.defense(game, def_cards, rng)
+                game.play(Play.create(off_card, def_card, off_offset, def_offset))
+            else:
+                getattr(game, action)()
+            plays += 1
+
+            # The drive is over once the ball changes hands or the phase does
+            # (a score or a safety), as in the real game. A blocked punt the
+            # offense recovers just moves on to the next down, so the drive
+            # goes on from there. Every drive that follows starts at 1st and
+            # 10, which is all Game.drive() can set up.
+            if game.phase != "play-selection" or game.ball_carrier is not offense:
+                break
+
+        return DriveOutcome(
+            plays,
+            _SETUPS[game.phase],
+            game.ydline if game.phase == "play-selection" else None,
+            game.ball_carrier is offense,
+            game.team1.score,
+            game.team2.score)
+
+    def _set(self, ydline, counts):
+        self._counts[ydline] = counts
+        self._outcomes[ydline] = list(counts)
+        cumulative, total = [], 0
+        for count in counts.values():
+            total += count
+            cumulative.append(total)
+        self._cumulative[ydline] = cumulative
+
+    def counts(self, ydline):
+        if ydline not in self._counts:
+            rng = random.Random(f"{self.seed}/{ydline}")
+            counts = {}
+            for sample in range(self.samples):
+                outcome = self._play_drive(ydline, rng)
+                counts[outcome] = counts.get(outcome, 0) + 1
+            self._set(ydline, counts)
+        return self._counts[ydline]
+
+    def distribution(self, ydline):
+        counts = self.counts(ydline)
+        total = sum(counts.values())
+        return {outcome: count / total for outcome, count in counts.items()}
+
+    def sample(self, ydline, rng):
+        self.counts(ydline)
+        cumulative = self._cumulative[ydline]
+        return self._outcomes[ydline][bisect.bisect_right(cumulative, rng.random() * cumulative[-1])]
+
+    def asjson(self):
+        return {
+            "version": DriveTables.VERSION,
+            "samples": self.samples,
+            "drives": {ydline: [[list(outcome), count] for outcome, count in counts.items()] for ydline, counts in self._counts.items()}
+        }
+
+    def dump(self, filepath):
+        with gzip.open(filepath, "wt") as tables_file:
+            json.dump(self.asjson(), tables_file, separators=(",", ":"))
+
+
+# Samples kicks (kick-offs, onside kicks and safety punts) as one-play
+# drives, from their exact distributions (see fourthand1.outcomes).
+class KickTables:
+    def __init__(self, rules=None):
+        self.outcomes = OutcomeTables.for_rules(rules)
+        self._sampling = {}
+
+    def sample(self, action, rng):
+        if action not in self._sampling:
+            outcomes, cumulative, total = [], [], 0.0
+            for effect, prob in self.outcomes.special_teams(action).items():
+                outcomes.append(DriveOutcome(
+                    1, effect.setup, effect.ydline if effect.setup == "drive" else None, effect.keeps_ball, effect.points, effect.opp_points))
+                total += prob
+                cumulative.append(total)
+            self._sampling[action] = (outcomes, cumulative)
+
+        outcomes, cumulative = self._sampling[action]
+        return outcomes[min(bisect.bisect_right(cumulative, rng.random() * cumulative[-1]), len(outcomes) - 1)]
+
+
+# Plays a game out like tournament.run_game, but skips through each drive in
+# a single step by sampling its outcome from the tables (built as needed, and
+# kept in `tables` by offense and defense policy, so pass the same dict to
+# every game of a season), and samples each kick the policies call for the
+# same way.
+def fast_forward_game(team1_name, policy1, team2_name, policy2, plays_per_quarter, seed, tables=None, deck=None, samples=500, kicks=None):
+    tables = {} if tables is None else tables
+    deck = deck or load_deck()
+    rng = random.Random(seed)
+
+    game = Game.create(team1_name, team2_name, plays_per_quarter, seed=rng.getrandbits(64))
+    kicks = kicks or KickTables(game.rules)
+    policies = {id(game.team1): policy1, id(game.team2): policy2}
+
+    game.coin_flip()
+    while game.phase not in ("overtime", "gameover"):
+        policy = policies[id(game.ball_carrier)]
+        if game.phase == "play-selection":
+            opponent = policies[id(game.defense)]
+            if (policy, opponent) not in tables:
+                tables[policy, opponent] = DriveTables(policy, opponent, samples, deck, game.rules)
+            game.drive(tables[policy, opponent].sample(game.ydline, rng))
+            continue
+
+        action = policy.action(game, rng)
+        if action not in game.action_names:
+            raise ValueError(f"{game.ball_carrier.name} can't {action} during {game.phase}.")
+        game.drive(kicks.sample(action, rng))
+    return game
@@ -1,3 +1,4 @@
+import contextvars
 import itertools
 import random
 
@@ -13,13 +14,41 @@ def _ydline_str(absydline):
         display_ydline = "goal line" if ydline == 0 else ydline
         return f"their own {display_ydline}" if absydline < 50 else f"the opponent's {display_ydline}"
 
-def roll_dice():
-    return sum(random.randint(1, 6) for k in range(3))
+_roller = contextvars.ContextVar("roller", default=None)
+
+# Every roll names its slot: what it's for, like "kickoff" or "pat". Rollers
+# can ignore it, or use it to keep a separate stream of rolls for each.
+def roll_dice(slot=None):
+    roller = _roller.get()
+    if roller is None:
+        return sum(random.randint(1, 6) for k in range(3))
+    return roller(slot)
+
+# Replaces where 3d6 rolls come from for everything created inside the block.
+# The roller is a callable taking the slot and returning the roll total.
+class use_dice:
+    def __init__(self, roller):
+        self.roller = roller
+        self._token = None
+
+    def __enter__(self):
+        self._token = _roller.set(self.roller)
+
+    def __exit__(self, *exc_info):
+        _roller.reset(self._token)
 
 class _Event:
+    # Whether create() needs the game's Ruleset to look up outcome tables.
+    USES_RULES = False
+
     @classmethod
     def factory(cls, *args, **kwargs):
-        return type(cls.__name__, (_EventFactory, ), {"CLS": cls})(*args, **kwargs)
+        # One factory type per event class, made the first time it's needed.
+        factory_cls = cls.__dict__.get("_factory_cls")
+        if factory_cls is None:
+            factory_cls = type(cls.__name__, (_EventFactory, ), {"CLS": cls})
+            cls._factory_cls = factory_cls
+        return factory_cls(*args, **kwargs)
 
     @classmethod
     def create(cls, *args, **kwargs):
@@ -62,6 +91,21 @@ class _InitialEvent(_Event):
             "from": self.from_ydline
         }
 
+# A class-level outcome table that's only built the first time it's read, so
+# importing the module doesn't create the factory types its entries use.
+class _LazyTable:
+    def __init__(self, build):
+        self.build = build
+
+    def __set_name__(self, owner, name):
+        self.owner = owner
+        self.name = name
+
+    def __get__(self, instance, owner):
+        table = self.build()
+        setattr(self.owner, self.name, table)
+        return table
+
 class _EventFactory:
     def __init__(self, play_yds=0, *args, **kwargs):
         self.play_yds = play_yds
@@ -71,6 +115,9 @@ class _EventFactory:
     def create(self, from_ydline):
         return self.CLS.create(from_ydline + self.play_yds, *self.args, **self.kwargs)
 
+    def bind(self, rules):
+        return type(self)(self.play_yds, *self.args, rules=rules, **self.kwargs)
+
     @property
     def yds(self):
         return self.play_yds
@@ -132,7 +179,7 @@ class Penalty(_Event):
 
     @classmethod
     def create(cls, play_end, penalty_dist):
-        against = "offense" if roll_dice() <= 10 else "defense"
+        against = "offense" if roll_dice("penalty") <= 10 else "defense"
         return cls(play_end, penalty_dist, against)
 
     def __init__(self, play_end, penalty_dist, against):
@@ -174,7 +221,7 @@ class Fumble(_Event):
 
     @classmethod
     def create(cls, recovered_from, retyds=0, recovered_by=None):
-        recovered_by = recovered_by or ("offense" if roll_dice() <= 10 else "defense")
+        recovered_by = recovered_by or ("offense" if roll_dice("fumble_recovery") <= 10 else "defense")
 
         result = None
         if recovered_by == "offense":
@@ -290,6 +337,7 @@ class OutOfBounds(_Event):
 
 class Interception(_Event):
     TYPE = "interception"
+    USES_RULES = True
     YDS = {
         3: Touchdown,
         4: 30,
@@ -310,9 +358,9 @@ class Interception(_Event):
     }
 
     @classmethod
-    def create(cls, return_from):
+    def create(cls, return_from, rules):
         penalty = None
-        returned = get_outcome(Interception.YDS)
+        returned = get_outcome(rules.interception, "interception_return")
         return_yds = return_from if isinstance(returned, Touchdown) else returned.yds
         if isinstance(returned, Penalty):
             penalty, returned = returned, Stop.create(returned.yds)
@@ -349,6 +397,7 @@ class Interception(_Event):
 
 class KickOff(_InitialEvent):
     TYPE = "kick-off"
+    USES_RULES = True
 
     YDS = {
         3: Touchback,
@@ -370,9 +419,9 @@ class KickOff(_InitialEvent):
     }
 
     @classmethod
-    def create(cls, kick_from):
+    def create(cls, kick_from, rules):
         penalty = None
-        kick_result = get_outcome(KickOff.YDS)
+        kick_result = get_outcome(rules.kickoff, "kickoff")
         if isinstance(kick_result, GoalLine):
             kick_yds = 100 - kick_from
         elif isinstance(kick_result, Touchback):
@@ -386,7 +435,7 @@ class KickOff(_InitialEvent):
         if kick_from + kick_yds > 110:
             kick_result = Touchback.create()
 
-        returned = None if isinstance(kick_result, Touchback) else KickOffReturn.create(kick_from + kick_yds)
+        returned = None if isinstance(kick_result, Touchback) else KickOffReturn.create(kick_from + kick_yds, rules)
         return cls(kick_from, kick_yds, kick_result, returned, penalty)
 
     def __init__(self, kick_from, kick_yds, kick_result, returned, penalty=None):
@@ -418,30 +467,33 @@ class KickOff(_InitialEvent):
 
 class KickOffReturn(_Event):
     TYPE = "kick-off return"
+    USES_RULES = True
 
-    YDS = {
-        3: Touchdown,
-        4: 70,
-        5: SpecialTeamsFumble.factory(0, recovered_by="kicking"),
-        6: 5,
-        7: 10,
-        8: 15,
-        9: 25,
-        10: 20,
-        11: 20,
-        12: 25,
-        13: 10,
-        14: 15,
-        15: 30,
-        16: 40,
-        17: 50,
-        18: (SpecialTeamsPenalty, (60, 15))
-    }
+    @_LazyTable
+    def YDS():
+        return {
+            3: Touchdown,
+            4: 70,
+            5: SpecialTeamsFumble.factory(0, recovered_by="kicking"),
+            6: 5,
+            7: 10,
+            8: 15,
+            9: 25,
+            10: 20,
+            11: 20,
+            12: 25,
+            13: 10,
+            14: 15,
+            15: 30,
+            16: 40,
+            17: 50,
+            18: (SpecialTeamsPenalty, (60, 15))
+        }
 
     @classmethod
-    def create(cls, return_from):
+    def create(cls, return_from, rules):
         penalty = None
-        returned = get_outcome(KickOffReturn.YDS)
+        returned = get_outcome(rules.kickoff_return, "kickoff_return")
         return_yds = return_from if isinstance(returned, Touchdown) else returned.yds
         if isinstance(returned, _EventFactory):
             returned = returned.create(return_from)
@@ -476,29 +528,32 @@ class KickOffReturn(_Event):
 
 class OnSideKick(_InitialEvent):
     TYPE = "on-side kick"
+    USES_RULES = True
 
-    YDS = {
-        3: 4,
-        4: 5,
-        5: 6,
-        6: 7,
-        7: 8,
-        8: SpecialTeamsFumble.factory(9),
-        9: SpecialTeamsFumble.factory(10),
-        10: SpecialTeamsFumble.factory(11),
-        11: SpecialTeamsFumble.factory(12),
-        12: 13,
-        13: 14,
-        14: 15,
-        15: 16,
-        16: 17,
-        17: 18,
-        18: 20
-    }
+    @_LazyTable
+    def YDS():
+        return {
+            3: 4,
+            4: 5,
+            5: 6,
+            6: 7,
+            7: 8,
+            8: SpecialTeamsFumble.factory(9),
+            9: SpecialTeamsFumble.factory(10),
+            10: SpecialTeamsFumble.factory(11),
+            11: SpecialTeamsFumble.factory(12),
+            12: 13,
+            13: 14,
+            14: 15,
+            15: 16,
+            16: 17,
+            17: 18,
+            18: 20
+        }
 
     @classmethod
-    def create(cls, kick_from):
-        result = get_outcome(OnSideKick.YDS)
+    def create(cls, kick_from, rules):
+        result = get_outcome(rules.onside_kick, "onside_kick")
         kick_yds = result.yds
         if isinstance(result, _EventFactory):
             result = result.create(kick_from)
@@ -527,6 +582,7 @@ class OnSideKick(_InitialEvent):
 
 class BlockedKick(_Event):
     TYPE = "blocked kick"
+    USES_RULES = True
 
     # Note: This table makes little sense. No matter who recovers the ball,
     # it travels in the same direction: behind the line of scrimmage (from the
@@ -554,8 +610,8 @@ class BlockedKick(_Event):
     }
 
     @classmethod
-    def create(cls, kick_from):
-        returned = get_outcome(BlockedKick.YDS)
+    def create(cls, kick_from, rules):
+        returned = get_outcome(rules.blocked_kick, "blocked_kick")
         recovered_by = "kicking" if returned.yds < 0 else "receiving"
 
         result = None
@@ -602,30 +658,33 @@ class BlockedKick(_Event):
 
 class PuntReturn(_Event):
     TYPE = "punt return"
+    USES_RULES = True
 
-    YDS = {
-        3: Touchdown,
-        4: FairCatch,
-        5: FairCatch,
-        6: SpecialTeamsFumble.factory(0, recovered_by="kicking"),
-        7: 2,
-        8: 5,
-        9: 9,
-        10: 7,
-        11: 10,
-        12: 8,
-        13: 10,
-        14: 15,
-        15: 20,
-        16: 30,
-        17: (SpecialTeamsPenalty, (40, 15)),
-        18: Touchdown
-    }
+    @_LazyTable
+    def YDS():
+        return {
+            3: Touchdown,
+            4: FairCatch,
+            5: FairCatch,
+            6: SpecialTeamsFumble.factory(0, recovered_by="kicking"),
+            7: 2,
+            8: 5,
+            9: 9,
+            10: 7,
+            11: 10,
+            12: 8,
+            13: 10,
+            14: 15,
+            15: 20,
+            16: 30,
+            17: (SpecialTeamsPenalty, (40, 15)),
+            18: Touchdown
+        }
 
     @classmethod
-    def create(cls, return_from):
+    def create(cls, return_from, rules):
         penalty = None
-        returned = get_outcome(PuntReturn.YDS)
+        returned = get_outcome(rules.punt_return, "punt_return")
         if isinstance(returned, _EventFactory):
             returned = returned.create(return_from)
         if isinstance(returned, Penalty):
@@ -633,7 +692,7 @@ class PuntReturn(_Event):
             penalty.yds = None
 
         if return_from > 100:
-            if return_from > 110 or isinstance(returned, FairCatch) or roll_dice() <= 10:
+            if return_from > 110 or isinstance(returned, FairCatch) or roll_dice("endzone_return") <= 10:
                 # 50% chance the punt is returned if into the endzone. The
                 # official rules say it's player's choice, but this simplifies
                 # things, at least for now.
@@ -671,61 +730,66 @@ class PuntReturn(_Event):
 
 class Punt(_InitialEvent):
     TYPE = "punt"
+    USES_RULES = True
 
-    IN_BOUNDS_YDS = {
-        3: 20,
-        4: BlockedKick.factory(0),
-        5: 30,
-        6: (SpecialTeamsPenalty, (35, 5)),
-        7: 20,
-        8: 25,
-        9: 40,
-        10: 40,
-        11: 40,
-        12: 40,
-        13: 45,
-        14: 50,
-        15: 55,
-        16: 60,
-        17: (SpecialTeamsPenalty, (65, 15)),
-        18: 70
-    }
+    @_LazyTable
+    def IN_BOUNDS_YDS():
+        return {
+            3: 20,
+            4: BlockedKick.factory(0),
+            5: 30,
+            6: (SpecialTeamsPenalty, (35, 5)),
+            7: 20,
+            8: 25,
+            9: 40,
+            10: 40,
+            11: 40,
+            12: 40,
+            13: 45,
+            14: 50,
+            15: 55,
+            16: 60,
+            17: (SpecialTeamsPenalty, (65, 15)),
+            18: 70
+        }
 
-    OUT_OF_BOUNDS_YDS = {
-        3: BlockedKick.factory(0),
-        4: BlockedKick.factory(0),
-        5: 20,
-        6: (SpecialTeamsPenalty, (25, 5)),
-        7: 15,
-        8: 15,
-        9: 20,
-        10: 25,
-        11: 30,
-        12: 35,
-        13: 40,
-        14: 45,
-        15: 40,
-        16: PuntReturn.factory(40),
-        17: PuntReturn.factory(25),
-        18: PuntReturn.factory(35)
-    }
+    @_LazyTable
+    def OUT_OF_BOUNDS_YDS():
+        return {
+            3: BlockedKick.factory(0),
+            4: BlockedKick.factory(0),
+            5: 20,
+            6: (SpecialTeamsPenalty, (25, 5)),
+            7: 15,
+            8: 15,
+            9: 20,
+            10: 25,
+            11: 30,
+            12: 35,
+            13: 40,
+            14: 45,
+            15: 40,
+            16: PuntReturn.factory(40),
+            17: PuntReturn.factory(25),
+            18: PuntReturn.factory(35)
+        }
 
     @classmethod
-    def create_out_of_bounds(cls, kick_from):
-        return cls.create(kick_from, Punt.OUT_OF_BOUNDS_YDS, OutOfBounds)
+    def create_out_of_bounds(cls, kick_from, rules):
+        return cls.create(kick_from, rules.punt_out_of_bounds, OutOfBounds.create)
 
     @classmethod
-    def create_in_bounds(cls, kick_from):
-        return cls.create(kick_from, Punt.IN_BOUNDS_YDS, PuntReturn)
+    def create_in_bounds(cls, kick_from, rules):
+        return cls.create(kick_from, rules.punt_in_bounds, lambda return_from: PuntReturn.create(return_from, rules))
 
     @classmethod
-    def create_safety(cls, kick_from):
-        return SafetyPunt.create(kick_from)
+    def create_safety(cls, kick_from, rules):
+        return SafetyPunt.create(kick_from, rules)
 
     @classmethod
-    def create(cls, kick_from, outcome_table, result_event):
+    def create(cls, kick_from, outcome_table, create_result):
         penalty = None
-        kick_result = get_outcome(outcome_table)
+        kick_result = get_outcome(outcome_table, "punt")
         kick_yds = kick_result.yds
         if isinstance(kick_result, _EventFactory):
             kick_result = kick_result.create(kick_from)
@@ -735,7 +799,7 @@ class Punt(_InitialEvent):
             penalty.yds = None
 
         if not isinstance(kick_result, (BlockedKick, Touchback, PuntReturn)):
-            kick_result = result_event.create(kick_from + kick_yds)
+            kick_result = create_result(kick_from + kick_yds)
 
         return cls(kick_from, kick_yds, kick_result, penalty)
 
@@ -765,6 +829,7 @@ class Punt(_InitialEvent):
 
 class FieldGoal(_InitialEvent):
     TYPE = "field goal"
+    USES_RULES = True
 
     PROB = {
         (91, 100): [(3, 11)],
@@ -793,27 +858,57 @@ class FieldGoal(_InitialEvent):
     ALT_BLOCKED_ROLL = (15, 16)
     ALT_MIN_YDLINE = min(min(ydlines) for ydlines in ALT_PROB)
 
-    @classmethod
-    def create(cls, kick_from):
-        blocked_roll = FieldGoal.BLOCKED_ROLL * (2 if len(FieldGoal.BLOCKED_ROLL) == 1 else 1)
-        roll_val = roll_dice()
-        if blocked_roll[0] <= roll_val <= blocked_roll[1]:
-            result = BlockedKick.create(kick_from)
-        else:
-            for yd_range, dice_ranges in FieldGoal.PROB.items():
-                if yd_range[0] <= kick_from <= yd_range[1]:
-                    for dice_range in dice_ranges:
-                        dice_range *= 2 if len(dice_range) == 1 else 1
-                        if dice_range[0] <= roll_val <= dice_range[1]:
-                            result = FieldGoalResult.create(True)
-                            break
-                    else:
-                        result = FieldGoalResult.create(False)
+    CHARTS = {
+        "standard": (PROB, BLOCKED_ROLL),
+        "alt": (ALT_PROB, ALT_BLOCKED_ROLL)
+    }
+    MIN_YDLINES = {
+        "standard": MIN_YDLINE,
+        "alt": ALT_MIN_YDLINE
+    }
 
+    _compiled_charts = {}
+
+    @staticmethod
+    def compiled_chart(name):
+        if name not in FieldGoal._compiled_charts:
+            FieldGoal._compiled_charts[name] = FieldGoal.compile_chart(*FieldGoal.CHARTS[name])
+        return FieldGoal._compiled_charts[name]
+
+    @staticmethod
+    def compile_chart(prob, blocked_roll):
+        # Flattens a chart into one 16-slot tuple per yard line, indexed by
+        # roll - 3, so an attempt is a pair of lookups rather than a scan.
+        def _expand(dice_range):
+            return dice_range * (2 if len(dice_range) == 1 else 1)
+
+        blocked = _expand(blocked_roll)
+        chart = []
+        for ydline in range(101):
+            made_ranges = []
+            for yd_range, dice_ranges in prob.items():
+                if yd_range[0] <= ydline <= yd_range[1]:
+                    made_ranges = [_expand(dice_range) for dice_range in dice_ranges]
                     break
-            else:
-                # Out of range.
-                result = FieldGoalResult.create(False)
+
+            outcomes = []
+            for roll_val in range(3, 19):
+                if blocked[0] <= roll_val <= blocked[1]:
+                    outcomes.append("blocked")
+                elif any(low <= roll_val <= high for low, high in made_ranges):
+                    outcomes.append("made")
+                else:
+                    outcomes.append("missed")
+            chart.append(tuple(outcomes))
+        return tuple(chart)
+
+    @classmethod
+    def create(cls, kick_from, rules):
+        outcome = rules.field_goal_outcome(kick_from, roll_dice("field_goal"))
+        if outcome == "blocked":
+            result = BlockedKick.create(kick_from, rules)
+        else:
+            result = FieldGoalResult.create(outcome == "made")
 
         return cls(kick_from, result)
 
@@ -867,7 +962,7 @@ class PATResult(_Event):
 
     @classmethod
     def create(cls):
-        return PATResult(3 <= roll_dice() <= 14)
+        return PATResult(3 <= roll_dice("pat") <= 14)
 
     def __init__(self, made):
         super().__init__()
@@ -926,8 +1021,15 @@ class SafetyPunt(Punt):
     }
 
     @classmethod
-    def create(cls, kick_from):
-        return super().create(kick_from, SafetyPunt.YDS, PuntReturn)
+    def create(cls, kick_from, rules):
+        return super().create(kick_from, rules.safety_punt, lambda return_from: PuntReturn.create(return_from, rules))
+
+    def apply(self, game):
+        # Unlike a regular punt there's no offense on the field; the kicking
+        # team was already set when the safety punt was set up.
+        game.ball_carrier = game.kicking
+        game.ydline = self.from_ydline + self.yds
+        self.kick_result.apply(game)
 
     def __str__(self):
         end_ydline = self.from_ydline + self.yds
@@ -935,32 +1037,54 @@ class SafetyPunt(Punt):
 
 class PlayResult(_InitialEvent):
     TYPE = "play from scrimmage"
+    USES_RULES = True
+
+    CONTACTS = ("touchdown", "tackle", "fumble", "interception", "incomplete")
 
+    # Where the play is stopped is purely a matter of the cards, so it's split
+    # out from the dice-driven result for anything that wants to tabulate it.
     @classmethod
-    def _eval_play(cls, from_ydline, off_play, def_play):
+    def contact(cls, off_play, def_play):
         for segment in off_play.path[1:]:
             for player in def_play.players:
                 if segment.rect.contains_square(player.rect):
                     play_yds = round(player.y)
-                    play_end = from_ydline + play_yds
                     int_rect = segment.int_rect
                     if int_rect and int_rect.contains_square(player.rect):
-                        result = Interception.create(play_end)
+                        return "interception", play_yds
                     elif isinstance(segment, (Run, Catch)):
-                        result = Fumble.create(play_end) if isinstance(player, Fumbler) else Tackle.create(play_end)
+                        return ("fumble" if isinstance(player, Fumbler) else "tackle"), play_yds
                     elif isinstance(segment, Lateral):
-                        result = Fumble.create(play_end)
+                        return "fumble", play_yds
                     elif isinstance(segment, Pass):
-                        result = Incomplete.create()
-                        play_yds = 0
-
-                    return result, play_yds
+                        return "incomplete", 0
         else:
+            return "touchdown", None
+
+    @classmethod
+    def create_result(cls, contact, from_ydline, play_yds, rules):
+        if contact == "touchdown":
             return Touchdown.create(), 100 - from_ydline
 
+        play_end = from_ydline + play_yds
+        if contact == "interception":
+            result = Interception.create(play_end, rules)
+        elif contact == "fumble":
+            result = Fumble.create(play_end)
+        elif contact == "tackle":
+            result = Tackle.create(play_end)
+        else:
+            result = Incomplete.create()
+        return result, play_yds
+
+    @classmethod
+    def _eval_play(cls, from_ydline, off_play, def_play, rules):
+        contact, play_yds = cls.contact(off_play, def_play)
+        return cls.create_result(contact, from_ydline, play_yds, rules)
+
     @classmethod
-    def create(cls, from_ydline, off_play, def_play):
-        result, play_yds = cls._eval_play(from_ydline, off_play, def_play)
+    def create(cls, from_ydline, off_play, def_play, rules):
+        result, play_yds = cls._eval_play(from_ydline, off_play, def_play, rules)
         return cls(from_ydline, play_yds, result)
 
     def __init__(self, from_ydline, yds, result):
@@ -985,14 +1109,29 @@ class PlayResult(_InitialEvent):
 
 
 # Might want to develop a way to handle successive events. For example, an entry should be able to be "3: (10, SpecialTeamPenalty, (15, ))", and have that interpreted as "[Stop.create(10), SpecialTeamsPenalty(15)]". This also means the corresponding classes (e.g. KickOff, KickOffReturn) would need to handle them. Probably by treating the first result as normal, and the second result in a special, specific way.
-def get_outcome(outcome_table):
-    outcome = outcome_table[roll_dice()]
-    if not isinstance(outcome, (_Event, _EventFactory)):
-        outcome_type = outcome if isinstance(outcome, type) else type(outcome)
-        if issubclass(outcome_type, (tuple, _Event)):
-            if issubclass(outcome_type, _Event):
-                outcome = (outcome, tuple())
-            return outcome[0].create(*outcome[1])
-        elif isinstance(outcome, int):
-            return Stop.create(outcome)
-    return outcome
+def get_outcome(outcome_table, slot=None):
+    return outcome_table[roll_dice(slot) - 3]()
+
+def _compile_outcome(outcome, rules):
+    if isinstance(outcome, _EventFactory):
+        if outcome.CLS.USES_RULES:
+            outcome = outcome.bind(rules)
+        return lambda: outcome
+    elif isinstance(outcome, _Event):
+        return lambda: outcome
+    elif isinstance(outcome, type) and issubclass(outcome, _Event):
+        return outcome.create
+    elif isinstance(outcome, tuple) and len(outcome) == 2 and issubclass(outcome[0], _Event):
+        event_cls, args = outcome
+        return lambda: event_cls.create(*args)
+    elif isinstance(outcome, int):
+        return lambda: Stop.create(outcome)
+    raise ValueError(f"Invalid outcome table entry: {outcome!r}")
+
+# Turns a {roll: entry} table into a 16-slot tuple, indexed by roll - 3, of
+# callables that build the outcome. Deciding how to build each entry happens
+# once here, rather than on every roll.
+def compile_outcome_table(outcome_table, rules):
+    if sorted(outcome_table) != list(range(3, 19)):
+        raise ValueError("An outcome table needs exactly one entry for each roll from 3 to 18.")
+    return tuple(_compile_outcome(outcome_table[roll_val], rules) for roll_val in range(3, 19))
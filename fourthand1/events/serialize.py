@@ -0,0 +1,96 @@
+import json
+
+from fourthand1.events import _Event, _InitialEvent, BlockedKick, FieldGoalResult, Fumble, PATResult, Penalty
+
+
+def _made_str(made):
+    return "made" if made else "missed"
+
+# The fields each asjson() override contributes, in the order it adds them:
+# (key, attribute, omitted when None, transform).
+_FIELDS = {
+    _Event: (("yds", "yds", True, None), ),
+    _InitialEvent: (("from", "from_ydline", False, None), ),
+    Penalty: (("penaltyYd", "penalty_dist", False, None), ("against", "against", False, None)),
+    Fumble: (("recoveredBy", "recovered_by", False, None), ),
+    BlockedKick: (("recoveredBy", "recovered_by", False, None), ),
+    FieldGoalResult: (("fgResult", "made", False, _made_str), ),
+    PATResult: (("patResult", "made", False, _made_str), )
+}
+
+_VALUE_CACHE = {}
+_VALUE_CACHE_SIZE = 4096
+
+def _value_bytes(value):
+    # Event values are almost always small ints and a handful of role names,
+    # so their encodings are cached rather than rebuilt for every event.
+    key = (value.__class__, value)
+    try:
+        return _VALUE_CACHE[key]
+    except KeyError:
+        value_bytes = json.dumps(value).encode()
+        if len(_VALUE_CACHE) < _VALUE_CACHE_SIZE:
+            _VALUE_CACHE[key] = value_bytes
+        return value_bytes
+    except TypeError:
+        return json.dumps(value).encode()
+
+def _layout(event_cls):
+    fields = []
+    for cls in reversed(event_cls.__mro__):
+        if "asjson" in vars(cls):
+            if cls not in _FIELDS:
+                # An asjson() this module doesn't know about; fall back to it.
+                return None
+            fields.extend(_FIELDS[cls])
+
+    type_prefix = b'{"type": ' + json.dumps(event_cls.TYPE).encode()
+    return type_prefix, tuple((f', "{key}": '.encode(), attr, optional, transform) for key, attr, optional, transform in fields)
+
+
+# Writes lists of events as the same bytes json.dumps() produces for their
+# asjson() output, without building the intermediate dicts.
+class EventEncoder:
+    def __init__(self):
+        self._buffer = bytearray()
+        self._layouts = {}
+
+    def _write_event(self, event, buffer):
+        event_cls = event.__class__
+        try:
+            layout = self._layouts[event_cls]
+        except KeyError:
+            layout = self._layouts[event_cls] = _layout(event_cls)
+
+        if layout is None:
+            buffer += json.dumps(event.asjson()).encode()
+            return
+
+        type_prefix, fields = layout
+        buffer += type_prefix
+        for key_bytes, attr, optional, transform in fields:
+            value = getattr(event, attr)
+            if optional and value is None:
+                continue
+            if transform:
+                value = transform(value)
+            buffer += key_bytes
+            buffer += _value_bytes(value)
+        buffer += b"}"
+
+    def write(self, events, buffer):
+        buffer += b"["
+        for index, event in enumerate(events):
+            if index:
+                buffer += b", "
+            self._write_event(event, buffer)
+        buffer += b"]"
+        return buffer
+
+    def dumps(self, events):
+        self._buffer.clear()
+        return bytes(self.write(events, self._buffer))
+
+    def dump(self, events, stream):
+        self._buffer.clear()
+        stream.write(self.write(events, self._buffer))
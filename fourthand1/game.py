@@ -1,19 +1,70 @@
 import random
 
-from fourthand1.events import *
+from fourthand1.events import FieldGoal, KickOff, OnSideKick, Punt, SafetyPunt, use_dice
+from fourthand1.rules import Ruleset
+
+
+PHASES = ("coin-flip", "coin-flip-result", "kickoff", "halftime", "safety", "play-selection", "overtime", "gameover")
+
+_KICKOFF_ACTIONS = (
+    {"name": "kickoff", "display": "Regular Kick-Off"},
+    {"name": "onside", "display": "Onside Kick"}
+)
+_FIELD_GOAL_ACTION = {"name": "field_goal", "display": "Field Goal"}
+
+# What can be done in each phase, built once rather than on every call to
+# Game.actions. The field goal is left out, since it also depends on the yard
+# line.
+PHASE_ACTIONS = {
+    "coin-flip": ({"name": "coin_flip", "display": "Coin Toss"}, ),
+    "coin-flip-result": _KICKOFF_ACTIONS,
+    "halftime": _KICKOFF_ACTIONS,
+    "kickoff": _KICKOFF_ACTIONS,
+    "safety": ({"name": "safety_punt", "display": "Safety Punt"}, ),
+    "play-selection": (
+        {"name": "play", "display": "Play"},
+        {"name": "punt_in_bounds", "display": "Punt (In Bounds)"},
+        {"name": "punt_out_of_bounds", "display": "Punt (Out Of Bounds)"}
+    )
+}
+
+PHASE_ACTION_NAMES = {
+    phase: frozenset(action["name"] for action in actions)
+    for phase, actions in PHASE_ACTIONS.items()
+}
 
 
 class Game:
     @staticmethod
-    def create(team1_name, team2_name, plays_per_quarter):
-        return Game(Team(team1_name), Team(team2_name), plays_per_quarter)
+    def create(team1_name, team2_name, plays_per_quarter, rules=None, seed=None, dice=None):
+        return Game(Team(team1_name), Team(team2_name), plays_per_quarter, rules, seed, dice)
 
-    def __init__(self, team1, team2, plays_per_quarter):
+    def __init__(self, team1, team2, plays_per_quarter, rules=None, seed=None, dice=None):
         self.team1 = team1
         self.team2 = team2
         self.plays_per_quarter = plays_per_quarter
-
-        self._ball_carrier = self._kicking = self._receiving = self._offense = self._defense = None
+        self.rules = rules or Ruleset.default()
+
+        # Each game rolls its own dice, so the seed and the actions taken
+        # (kept in history) are enough to play the game out again. Games
+        # given their own roller (see events.use_dice) roll with that
+        # instead, and can't be replayed. A roller with a start_action()
+        # method is told the index in history of each action before it
+        # rolls for it.
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.dice = dice
+        self._start_action = getattr(dice, "start_action", None)
+        self.history = []
+        # How many actions came before the first one in history. Only games
+        # restored without their history (see restore()) have any.
+        self.history_start = 0
+        # How many dice have been rolled from rng. Along with the seed, that's
+        # all it takes to put the RNG back where it was (see _seek_rng()).
+        self._rolls = 0
+
+        self._ball_carrier = self._last_ball_carrier = None
+        self._kicking = self._receiving = self._offense = self._defense = None
         self.ydline = None
         self.down = None
         self.first_down_ydline = None
@@ -24,12 +75,76 @@ class Game:
         self._quarter = 1
 
     def coin_flip(self):
+        self.history.append(("coin_flip", ))
+
         teams = (self.team1, self.team2)
-        self.ball_carrier = teams[random.randint(0, 1)]
+        self.ball_carrier = teams[self.rng.randint(0, 1)]
         self.setup_kickoff()
 
         self._phase = "coin-flip-result"
 
+    # A snapshot of everything the next action depends on, teams included by
+    # number (1 or 2, or 0 for none), so a game can be picked back up from it
+    # without playing the actions before it again.
+    def state(self):
+        teams = (None, self.team1, self.team2)
+        return {
+            "actions": self.history_start + len(self.history),
+            "phase": self._phase,
+            "quarter": self._quarter,
+            "playnum": self._playnum,
+            "ball_carrier": teams.index(self._ball_carrier),
+            "last_ball_carrier": teams.index(self._last_ball_carrier),
+            "kicking": teams.index(self._kicking),
+            "offense": teams.index(self._offense),
+            "ydline": self.ydline,
+            "down": self.down,
+            "first_down_ydline": self.first_down_ydline,
+            "scores": (self.team1.score, self.team2.score),
+            "rolls": self._rolls,
+            "rng": self.rng.getstate()
+        }
+
+    # Picks the game back up from a state. Without the history, the game only
+    # knows how many actions came before, not what they were. Without "rng",
+    # the RNG is put back from the seed and "rolls" instead.
+    def restore(self, state, history=None):
+        if history is None:
+            self.history_start, self.history = state["actions"], []
+        elif len(history) != state["actions"]:
+            raise ValueError(f"Expected {state['actions']} actions of history, got {len(history)}.")
+        else:
+            self.history_start, self.history = 0, list(history)
+
+        teams = (None, self.team1, self.team2)
+        self._phase = state["phase"]
+        self._quarter = state["quarter"]
+        self._playnum = state["playnum"]
+        self._ball_carrier = teams[state["ball_carrier"]]
+        self._last_ball_carrier = teams[state["last_ball_carrier"]]
+        self.kicking = teams[state["kicking"]]
+        self.offense = teams[state["offense"]]
+        self.ydline = state["ydline"]
+        self.down = state["down"]
+        self.first_down_ydline = state["first_down_ydline"]
+        self.team1.score, self.team2.score = state["scores"]
+        self._setup_queue = []
+        if "rng" in state:
+            self.rng.setstate(state["rng"])
+            self._rolls = state["rolls"]
+        else:
+            self._seek_rng(state["rolls"])
+
+    # Draws from a freshly seeded RNG what the coin flip (if there's been one)
+    # and the given number of dice rolls would have.
+    def _seek_rng(self, rolls):
+        self.rng.seed(self.seed)
+        if self._phase != "coin-flip":
+            self.rng.randint(0, 1)
+        for draw in range(3 * rolls):
+            self.rng.randint(1, 6)
+        self._rolls = rolls
+
     def role_to_team(self, role):
         return getattr(self, role)
 
@@ -42,32 +157,30 @@ class Game:
     def phase(self):
         return self._phase
 
+    @property
+    def quarter(self):
+        return self._quarter
+
+    @property
+    def playnum(self):
+        return self._playnum
+
+    def _can_kick_field_goal(self):
+        return self._phase == "play-selection" and self.ydline >= self.rules.field_goal_min_ydline
+
     @property
     def actions(self):
-        if self.phase == "coin-flip":
-            return ({"name": "coin_flip", "display": "Coin Toss"}, )
-        elif self.phase in ("coin-flip-result", "halftime", "kickoff"):
-            return (
-                {"name": "kickoff", "display": "Regular Kick-Off"},
-                {"name": "onside", "display": "Onside Kick"}
-            )
-        elif self.phase == "safety":
-            return ({"name": "safety_punt", "display": "Safety Punt"})
-        elif self.phase == "play-selection":
-            actions = [
-                {"name": "play", "display": "Play"},
-                {"name": "punt_in_bounds", "display": "Punt (In Bounds)"},
-                {"name": "punt_out_of_bounds", "display": "Punt (Out Of Bounds)"}
-            ]
-            if self.ydline >= FieldGoal.MIN_YDLINE:
-                actions.append({"name": "field_goal", "display": "Field Goal"})
-            return tuple(actions)
-        else:
-            return tuple()
+        actions = PHASE_ACTIONS.get(self._phase, ())
+        if self._can_kick_field_goal():
+            actions += (_FIELD_GOAL_ACTION, )
+        return actions
 
     @property
     def action_names(self):
-        return {action["name"] for action in self.actions}
+        names = PHASE_ACTION_NAMES.get(self._phase, frozenset())
+        if self._can_kick_field_goal():
+            names |= {"field_goal"}
+        return names
 
     @property
     def ball_carrier(self):
@@ -128,8 +241,17 @@ class Game:
                 else:
                     self._phase = "gameover"
 
-    def _run(self, create_event):
-        events = create_event(self.ydline)
+    def _roll_dice(self, slot=None):
+        self._rolls += 1
+        return sum(self.rng.randint(1, 6) for k in range(3))
+
+    def _run(self, action, create_event):
+        self.history.append(action)
+
+        if self._start_action:
+            self._start_action(self.history_start + len(self.history) - 1)
+        with use_dice(self.dice or self._roll_dice):
+            events = create_event(self.ydline, self.rules)
         events.apply(self)
 
         self._resolve_queue()
@@ -139,25 +261,91 @@ class Game:
         return events.resolve()
 
     def kickoff(self):
-        return self._run(KickOff.create)
+        return self._run(("kickoff", ), KickOff.create)
 
     def onside(self):
-        return self._run(OnSideKick.create)
+        return self._run(("onside", ), OnSideKick.create)
 
     def punt_in_bounds(self):
-        return self._run(Punt.create_in_bounds)
+        return self._run(("punt_in_bounds", ), Punt.create_in_bounds)
 
     def punt_out_of_bounds(self):
-        return self._run(Punt.create_out_of_bounds)
+        return self._run(("punt_out_of_bounds", ), Punt.create_out_of_bounds)
 
     def field_goal(self):
-        return self._run(FieldGoal.create)
+        return self._run(("field_goal", ), FieldGoal.create)
 
     def safety_punt(self):
-        return self._run(SafetyPunt.create)
+        return self._run(("safety_punt", ), SafetyPunt.create)
 
     def play(self, play):
-        return self._run(play.run)
+        action = ("play", play.off_play.id, play.def_play.id, play.off_offset, play.def_offset)
+        return self._run(action, play.run)
+
+    # Skips through a whole drive without playing its snaps, given its outcome
+    # (see fourthand1.drives). A kick can be skipped the same way, as a drive
+    # of one play. The clock runs for each of its plays, and if it runs out
+    # partway (at the half or the end of the game), the drive stops there
+    # without a score, as it would have if played out. Otherwise the result is
+    # set up as the drive's last play would have left it. A "drive" result
+    # starts the next drive at 1st and 10, so a drive has to run until the
+    # ball changes hands (or the phase changes), not stop partway through a
+    # series. Games with skipped drives can't be replayed.
+    def drive(self, outcome):
+        if self._phase in ("coin-flip", "overtime", "gameover"):
+            raise ValueError(f"Can't start a drive during {self._phase}.")
+        if outcome.plays < 1:
+            raise ValueError(f"A drive takes at least one play, not {outcome.plays}.")
+
+        self.history.append(("drive", ) + tuple(outcome))
+        for play in range(outcome.plays - 1):
+            self._advance_playcounter()
+            if self._phase != "play-selection":
+                return
+
+        offense = self.ball_carrier
+        defense = self.opponent(offense)
+        offense.score += outcome.points
+        defense.score += outcome.opp_points
+        self.ball_carrier = offense if outcome.keeps_ball else defense
+
+        if outcome.setup == "drive":
+            # With the kick (if any) over, setup_drive() flips the field over
+            # for the new drive.
+            self.kicking = None
+            self.ydline = 100 - outcome.ydline
+            self.setup_drive()
+        elif outcome.setup == "kickoff":
+            self.setup_kickoff()
+        elif outcome.setup == "safety_punt":
+            self.setup_safety_punt()
+        else:
+            raise ValueError(f"Unknown drive result: {outcome.setup}")
+
+        self._advance_playcounter()
+
+    # Takes each action as its name, or as a tuple of its name and arguments.
+    # A play can be given either as ("play", play) or as ("play", off_card,
+    # def_card, off_offset, def_offset), with the offsets optional. Each action
+    # is checked against the phase the game is in when its turn comes; the
+    # first one that isn't allowed raises a ValueError, leaving the ones
+    # before it done. Returns the events of every action, in order.
+    def perform_many(self, actions):
+        events = []
+        for action in actions:
+            name, *args = (action, ) if isinstance(action, str) else action
+            allowed = name in PHASE_ACTION_NAMES.get(self._phase, ()) or (name == "field_goal" and self._can_kick_field_goal())
+            if not allowed:
+                raise ValueError(f"Can't {name} during {self._phase}.")
+
+            if name == "play" and len(args) != 1:
+                # Deferred, so that importing the game doesn't mean importing
+                # all of the play geometry.
+                from fourthand1.play import Play
+
+                args = [Play.create(*args)]
+            events.extend(getattr(self, name)(*args) or ())
+        return events
 
 
     def setup_kickoff(self):
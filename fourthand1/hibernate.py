@@ -0,0 +1,258 @@
+import os
+import re
+import sqlite3
+import struct
+import time
+from collections import OrderedDict
+
+from fourthand1.game import PHASES, Game
+
+
+MAGIC = b"4t1h"
+VERSION = 1
+
+_PHASE = {phase: code for code, phase in enumerate(PHASES)}
+
+# Space for each team name, in UTF-8 bytes.
+NAME_SIZE = 32
+
+# A game between actions, in a fixed-size block: magic, version, seed,
+# plays_per_quarter, both team names (NUL-padded), phase, quarter, playnum,
+# the four team slots packed into a byte (as in replay keyframes), ydline,
+# down, first_down_ydline, both scores, the number of actions taken and the
+# number of dice rolled. The RNG is put back from the seed and the roll count,
+# rather than stored. None is kept as _NONE for the yard lines and 0 for the
+# down. The pending setup queue isn't included, since it's always emptied
+# before an action returns.
+_STATE = struct.Struct(f"<4sBQH{NAME_SIZE}s{NAME_SIZE}sBBHBhbhHHII")
+_NONE = -0x8000
+
+
+def _pack_optional(value):
+    return _NONE if value is None else value
+
+def _unpack_optional(value):
+    return None if value == _NONE else value
+
+def _encode_name(name):
+    encoded = name.encode("utf-8")
+    if len(encoded) > NAME_SIZE or b"\0" in encoded:
+        raise ValueError(f"Team names have to fit in {NAME_SIZE} bytes, without NULs, to be encoded: {name!r}")
+    return encoded
+
+def _check_encodable(game):
+    if game.dice is not None:
+        raise ValueError("Games with their own dice can't be encoded.")
+    if not isinstance(game.seed, int) or not 0 <= game.seed < 1 << 64:
+        raise ValueError(f"Only games with a 64-bit unsigned integer seed can be encoded: {game.seed!r}")
+    _encode_name(game.team1.name)
+    _encode_name(game.team2.name)
+
+# The history isn't kept, so a decoded game knows how many actions it's had
+# but not what they were, and can't be recorded as a replay. Rules aren't
+# included either, so the game has to be decoded with the same ones.
+def encode_game(game):
+    _check_encodable(game)
+
+    state = game.state()
+    return _STATE.pack(
+        MAGIC,
+        VERSION,
+        game.seed,
+        game.plays_per_quarter,
+        _encode_name(game.team1.name),
+        _encode_name(game.team2.name),
+        _PHASE[state["phase"]],
+        state["quarter"],
+        state["playnum"],
+        ((state["ball_carrier"] * 3 + state["last_ball_carrier"]) * 3 + state["kicking"]) * 3 + state["offense"],
+        _pack_optional(state["ydline"]),
+        state["down"] or 0,
+        _pack_optional(state["first_down_ydline"]),
+        state["scores"][0],
+        state["scores"][1],
+        state["actions"],
+        state["rolls"])
+
+def decode_game(data, rules=None):
+    if len(data) != _STATE.size:
+        raise ValueError(f"Encoded games are {_STATE.size} bytes, not {len(data)}.")
+
+    (magic, version, seed, plays_per_quarter, team1_name, team2_name, phase, quarter, playnum, teams,
+        ydline, down, first_down_ydline, score1, score2, actions, rolls) = _STATE.unpack(data)
+    if magic != MAGIC:
+        raise ValueError("Not an encoded game.")
+    if version != VERSION:
+        raise ValueError(f"Unsupported game encoding version: {version}")
+    if phase >= len(PHASES):
+        raise ValueError(f"Unknown phase code in encoded game: {phase}")
+    if teams >= 3 ** 4:
+        raise ValueError("Invalid teams in encoded game.")
+
+    teams, offense = divmod(teams, 3)
+    teams, kicking = divmod(teams, 3)
+    ball_carrier, last_ball_carrier = divmod(teams, 3)
+    state = {
+        "actions": actions,
+        "phase": PHASES[phase],
+        "quarter": quarter,
+        "playnum": playnum,
+        "ball_carrier": ball_carrier,
+        "last_ball_carrier": last_ball_carrier,
+        "kicking": kicking,
+        "offense": offense,
+        "ydline": _unpack_optional(ydline),
+        "down": down or None,
+        "first_down_ydline": _unpack_optional(first_down_ydline),
+        "scores": (score1, score2),
+        "rolls": rolls
+    }
+
+    game = Game.create(team1_name.rstrip(b"\0").decode("utf-8"), team2_name.rstrip(b"\0").decode("utf-8"), plays_per_quarter, rules, seed)
+    game.restore(state)
+    return game
+
+
+# Hibernated games as one file each in a directory, written to a temporary
+# file first so a crash never leaves half a game behind.
+class FileStore:
+    _SESSION_ID = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9_.-]*")
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id):
+        if not FileStore._SESSION_ID.fullmatch(session_id):
+            raise ValueError(f"Invalid session id for a file store: {session_id!r}")
+        return os.path.join(self.directory, session_id + ".game")
+
+    def save(self, session_id, data):
+        path = self._path(session_id)
+        with open(path + ".tmp", "wb") as game_file:
+            game_file.write(data)
+        os.replace(path + ".tmp", path)
+
+    def load(self, session_id):
+        try:
+            with open(self._path(session_id), "rb") as game_file:
+                return game_file.read()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, session_id):
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        pass
+
+
+class SQLiteStore:
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data BLOB NOT NULL)")
+        self.connection.commit()
+
+    def save(self, session_id, data):
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO sessions (id, data) VALUES (?, ?)", (session_id, data))
+
+    def load(self, session_id):
+        row = self.connection.execute("SELECT data FROM sessions WHERE id = ?", (session_id, )).fetchone()
+        return bytes(row[0]) if row else None
+
+    def delete(self, session_id):
+        with self.connection:
+            self.connection.execute("DELETE FROM sessions WHERE id = ?", (session_id, ))
+
+    def close(self):
+        self.connection.close()
+
+
+# Keeps up to `capacity` games in memory, by session id, and hibernates the
+# rest to the store (a FileStore or SQLiteStore), least recently used first.
+# A hibernated game is brought back the next time it's asked for, so callers
+# can treat every session as if it were always in memory. hibernate_idle()
+# also puts away any game that's gone untouched for a while, however few there
+# are.
+#
+# Only games encode_game() can handle can be added, and every game has to be
+# played with the rules given here. Hibernated games come back without their
+# history.
+class Hibernator:
+    def __init__(self, store, capacity=1024, rules=None, clock=time.monotonic):
+        if capacity < 1:
+            raise ValueError(f"A hibernator has to hold at least one game, not {capacity}.")
+
+        self.store = store
+        self.capacity = capacity
+        self.rules = rules
+        self.clock = clock
+        self.hibernated = 0
+        self.restored = 0
+        self._games = OrderedDict()
+        self._last_used = {}
+
+    def __len__(self):
+        return len(self._games)
+
+    def __contains__(self, session_id):
+        return session_id in self._games or self.store.load(session_id) is not None
+
+    def add(self, session_id, game):
+        _check_encodable(game)
+        if session_id in self:
+            raise ValueError(f"There's already a session named {session_id}.")
+
+        self._touch(session_id, game)
+        return game
+
+    def get(self, session_id):
+        game = self._games.get(session_id)
+        if game is None:
+            data = self.store.load(session_id)
+            if data is None:
+                raise ValueError(f"There's no session named {session_id}.")
+            game = decode_game(data, self.rules)
+            self.store.delete(session_id)
+            self.restored += 1
+
+        self._touch(session_id, game)
+        return game
+
+    # Runs the action on the session's game, waking it up first if needed.
+    def perform(self, session_id, action, *args):
+        return getattr(self.get(session_id), action)(*args)
+
+    def _touch(self, session_id, game):
+        self._games[session_id] = game
+        self._games.move_to_end(session_id)
+        self._last_used[session_id] = self.clock()
+        while len(self._games) > self.capacity:
+            self.hibernate(next(iter(self._games)))
+
+    def hibernate(self, session_id):
+        game = self._games.pop(session_id, None)
+        if game is not None:
+            del self._last_used[session_id]
+            self.store.save(session_id, encode_game(game))
+            self.hibernated += 1
+
+    def hibernate_idle(self, max_idle):
+        cutoff = self.clock() - max_idle
+        idle = [session_id for session_id in self._games if self._last_used[session_id] <= cutoff]
+        for session_id in idle:
+            self.hibernate(session_id)
+        return idle
+
+    def hibernate_all(self):
+        for session_id in list(self._games):
+            self.hibernate(session_id)
+
+    def remove(self, session_id):
+        self._games.pop(session_id, None)
+        self._last_used.pop(session_id, None)
+        self.store.delete(session_id)
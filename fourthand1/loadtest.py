@@ -0,0 +1,237 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import defaultdict
+
+from fourthand1.cards import load_deck
+from fourthand1.events.serialize import EventEncoder
+from fourthand1.game import Game
+from fourthand1.policies import ConservativePolicy
+from fourthand1.tournament import next_action
+
+
+# Latencies in log-linear buckets, as in HdrHistogram: exact up to
+# 2 * 10 ** significant_figures, and beyond that grouped into buckets no
+# wider than that fraction of their value, so any percentile is reported
+# to within it however wide the range of values. Values are whole numbers
+# (nanoseconds, here), and percentiles are reported as the highest value of
+# their bucket.
+class LatencyHistogram:
+    def __init__(self, significant_figures=2):
+        self.sub_bucket_bits = (2 * 10 ** significant_figures - 1).bit_length()
+        self.half_count = 1 << (self.sub_bucket_bits - 1)
+        self.counts = []
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        shift = max(value.bit_length() - self.sub_bucket_bits, 0)
+        return shift * self.half_count + (value >> shift)
+
+    def _highest_value(self, index):
+        if index < 2 * self.half_count:
+            return index
+        shift = index // self.half_count - 1
+        return ((index - shift * self.half_count + 1) << shift) - 1
+
+    def record(self, value):
+        if value < 0:
+            raise ValueError(f"Can't record a negative latency: {value}")
+
+        index = self._index(value)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("Can't merge histograms of different precision.")
+
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent):
+        if not self.count:
+            return None
+
+        target = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._highest_value(index), self.max)
+        return self.max
+
+
+# Plays games directly, so latency is just the time each action takes.
+class InProcessTarget:
+    def __init__(self):
+        self.games = {}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def new_game(self, session_id, plays_per_quarter, seed):
+        game = self.games[session_id] = Game.create("Home", "Away", plays_per_quarter, seed=seed)
+        return game
+
+    def end_game(self, session_id):
+        del self.games[session_id]
+
+    async def perform(self, session_id, action):
+        return self.games[session_id].perform_many([action])
+
+
+# Stands in for a server: requests wait in a queue for a single server task,
+# which performs each one and serializes its events as the response, the way
+# a real one would. Latency then includes the time spent waiting in line
+# behind other clients' requests, which is what blows up the tail under load.
+class ServerStandIn(InProcessTarget):
+    def __init__(self):
+        super().__init__()
+        self._requests = None
+        self._server = None
+        self._encoder = EventEncoder()
+
+    async def start(self):
+        self._requests = asyncio.Queue()
+        self._server = asyncio.ensure_future(self._serve())
+
+    async def stop(self):
+        self._server.cancel()
+        try:
+            await self._server
+        except asyncio.CancelledError:
+            pass
+
+    async def _serve(self):
+        while True:
+            session_id, action, response = await self._requests.get()
+            try:
+                events = self.games[session_id].perform_many([action])
+                response.set_result(self._encoder.dumps(events))
+            except Exception as exc:
+                response.set_exception(exc)
+
+    async def perform(self, session_id, action):
+        response = asyncio.get_running_loop().create_future()
+        self._requests.put_nowait((session_id, action, response))
+        return await response
+
+
+TARGETS = {
+    "inprocess": InProcessTarget,
+    "server": ServerStandIn
+}
+
+# One simulated player, playing both sides of game after game until the
+# deadline, pausing a random think time (exponentially distributed, with the
+# given mean) before each action. Latencies are recorded in nanoseconds by
+# action name.
+async def _client(target, client_index, histograms, deadline, plays_per_quarter, think_time, seed, deck):
+    loop = asyncio.get_running_loop()
+    rng = random.Random(f"{seed}/{client_index}")
+    policy = ConservativePolicy()
+
+    # Spread the clients out, rather than have them all start at once.
+    await asyncio.sleep(rng.uniform(0, think_time))
+
+    game_num = 0
+    while loop.time() < deadline:
+        session_id = f"{client_index}/{game_num}"
+        game = target.new_game(session_id, plays_per_quarter, rng.getrandbits(64))
+        policies = {id(game.team1): policy, id(game.team2): policy}
+        game_num += 1
+
+        action = ("coin_flip", )
+        while loop.time() < deadline:
+            if think_time:
+                await asyncio.sleep(rng.expovariate(1 / think_time))
+
+            start = time.perf_counter_ns()
+            await target.perform(session_id, action)
+            histograms[action[0]].record(time.perf_counter_ns() - start)
+
+            if game.phase in ("overtime", "gameover"):
+                break
+
+            action = next_action(game, policies, deck, rng)
+        target.end_game(session_id)
+
+# Returns the latency histograms by action name, and how many seconds the
+# clients ran for.
+async def run(clients=1000, duration=10.0, think_time=0.05, plays_per_quarter=15, target="inprocess", seed=0):
+    target = TARGETS[target]()
+    deck = load_deck()
+    histograms = defaultdict(LatencyHistogram)
+
+    await target.start()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    try:
+        await asyncio.gather(*[
+            _client(target, client_index, histograms, start + duration, plays_per_quarter, think_time, seed, deck)
+            for client_index in range(clients)])
+    finally:
+        await target.stop()
+    return histograms, loop.time() - start
+
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+def print_report(histograms, elapsed, stream=sys.stdout):
+    overall = LatencyHistogram()
+    for histogram in histograms.values():
+        overall.merge(histogram)
+
+    print(f"{overall.count} actions in {elapsed:.2f}s ({overall.count / elapsed:.1f}/s)", file=stream)
+    print(f"{'action':<20}{'count':>9}" + "".join(f"{f'p{percent}':>10}" for percent in PERCENTILES) + f"{'max':>10}  (ms)", file=stream)
+    for name, histogram in list(histograms.items()) + [("all", overall)]:
+        if histogram.count:
+            values = [histogram.percentile(percent) for percent in PERCENTILES] + [histogram.max]
+            print(f"{name:<20}{histogram.count:>9}" + "".join(f"{value / 1e6:>10.3f}" for value in values), file=stream)
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(prog="python -m fourthand1.loadtest")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to keep the clients playing.")
+    parser.add_argument("--think-time", type=float, default=0.05, help="Mean seconds each client waits before an action.")
+    parser.add_argument("--plays-per-quarter", type=int, default=15)
+    parser.add_argument("--target", choices=tuple(TARGETS), default="inprocess")
+    parser.add_argument("--seed", type=int, default=0)
+    return vars(parser.parse_args(args))
+
+def main(args=None):
+    args = parse_args(args)
+
+    histograms, elapsed = asyncio.run(run(
+        args["clients"], args["duration"], args["think_time"], args["plays_per_quarter"], args["target"], args["seed"]))
+    print_report(histograms, elapsed)
+
+
+if __name__ == "__main__":
+    main()
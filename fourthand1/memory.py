@@ -0,0 +1,137 @@
+import random
+import sys
+import tracemalloc
+import types
+from collections import defaultdict
+
+from fourthand1.play import Play
+from fourthand1.policies import RandomPolicy
+from fourthand1.tournament import run_game
+
+
+_NOT_OWNED = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.CodeType)
+
+# Bytes held by everything reachable from obj, other than classes, functions,
+# modules and whatever is in shared. For a Game, that's the game itself, its
+# Teams, RNG, history and _setup_queue, but not its Ruleset, which games
+# share. Strings a game only refers to (like its phase) are counted too, so
+# this errs on the high side.
+def footprint(obj, shared=()):
+    seen = {id(shared_obj) for shared_obj in shared}
+    pending = [obj]
+    total = 0
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, _NOT_OWNED):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+
+        if isinstance(obj, dict):
+            pending.extend(obj.keys())
+            pending.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            pending.extend(obj)
+        elif isinstance(obj, types.MethodType):
+            pending.append(obj.__self__)
+
+        if hasattr(obj, "__dict__"):
+            pending.append(vars(obj))
+    return total
+
+def session_footprint(game):
+    return footprint(game, shared=(game.rules, ))
+
+
+class ActionAllocations:
+    def __init__(self):
+        self.calls = 0
+        self.retained = 0
+        self.peak = 0
+        self.max_peak = 0
+
+    @property
+    def mean_retained(self):
+        return self.retained / self.calls if self.calls else 0
+
+    @property
+    def mean_peak(self):
+        return self.peak / self.calls if self.calls else 0
+
+
+# Measures what each action method costs in memory while tracemalloc is
+# running. "retained" is what's still allocated once the action returns (the
+# events it hands back included), and "peak" is the high water mark above
+# where it started, which is what the garbage it makes along the way costs.
+# Peaks need tracemalloc.reset_peak(), so they're only measured on Python 3.9
+# and up.
+class AllocationTracker:
+    def __init__(self):
+        self.actions = defaultdict(ActionAllocations)
+        self.footprints = []
+        self._started = False
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def perform(self, game, action, *args):
+        reset_peak = getattr(tracemalloc, "reset_peak", None)
+        if reset_peak:
+            reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+
+        result = getattr(game, action)(*args)
+
+        current, peak = tracemalloc.get_traced_memory()
+        allocations = self.actions[action]
+        allocations.calls += 1
+        allocations.retained += current - before
+        if reset_peak:
+            allocations.peak += peak - before
+            allocations.max_peak = max(allocations.max_peak, peak - before)
+        return result
+
+    def record_footprint(self, game):
+        self.footprints.append(session_footprint(game))
+
+    # The per-session cost once a game is under way: the mean footprint over
+    # the second half of the samples.
+    @property
+    def steady_footprint(self):
+        steady = self.footprints[len(self.footprints) // 2:]
+        return sum(steady) / len(steady) if steady else 0
+
+    def print_report(self, stream=sys.stdout):
+        print(f"{'action':<20} {'calls':>7} {'retained B':>11} {'peak B':>9} {'max peak B':>11}", file=stream)
+        for action, allocations in sorted(self.actions.items(), key=lambda item: -item[1].mean_peak):
+            print(
+                f"{action:<20} {allocations.calls:>7} {allocations.mean_retained:>11.0f} "
+                f"{allocations.mean_peak:>9.0f} {allocations.max_peak:>11}", file=stream)
+        if self.footprints:
+            print(f"Session footprint: {self.steady_footprint:.0f}B steady, {max(self.footprints)}B max", file=stream)
+
+
+# Plays seeded games at random through the tracker. The events each action
+# returns are dropped before the next one, like a server sending them off
+# would, and the footprint of the session is sampled after every action.
+def track_games(tracker, num_games, plays_per_quarter, deck, seed=0):
+    def perform(game, action):
+        name, *args = action
+        if name == "play":
+            args = [Play.create(*args)]
+        events = tracker.perform(game, name, *args)
+        tracker.record_footprint(game)
+        return events
+
+    pick = random.Random(seed)
+    policy = RandomPolicy()
+    for game_num in range(num_games):
+        run_game("Home", policy, "Away", policy, plays_per_quarter, pick.getrandbits(64), deck, perform=perform)
@@ -0,0 +1,152 @@
+import itertools
+import weakref
+from collections import Counter, namedtuple
+
+from fourthand1.events import FieldGoal, KickOff, OnSideKick, PlayResult, Punt, SafetyPunt, use_dice
+from fourthand1.game import Game
+from fourthand1.rules import Ruleset
+
+
+ROLL_PROBS = {
+    roll_val: count / 216
+    for roll_val, count in sorted(Counter(sum(dice) for dice in itertools.product(range(1, 7), repeat=3)).items())
+}
+
+SETUPS = ("next_play", "drive", "kickoff", "safety_punt")
+
+# What an action does to the game, from the point of view of the team that
+# took it (the kicking team or the offense). "ydline" is where the ball ends
+# up once the next phase is set up, except for "next_play", where it is where
+# the play ended: setting up the next play depends on the down and distance
+# before the play, which aren't part of the outcome.
+Effect = namedtuple("Effect", ("setup", "ydline", "keeps_ball", "points", "opp_points", "types"))
+
+# The phase each special teams action is taken from, and where it's taken
+# from when that's fixed.
+SPECIAL_TEAMS = {
+    "kickoff": ("kickoff", 40),
+    "onside": ("kickoff", 40),
+    "safety_punt": ("safety", 20),
+    "punt_in_bounds": ("play-selection", None),
+    "punt_out_of_bounds": ("play-selection", None),
+    "field_goal": ("play-selection", None)
+}
+
+_CREATE = {
+    "kickoff": KickOff.create,
+    "onside": OnSideKick.create,
+    "safety_punt": SafetyPunt.create,
+    "punt_in_bounds": Punt.create_in_bounds,
+    "punt_out_of_bounds": Punt.create_out_of_bounds,
+    "field_goal": FieldGoal.create
+}
+
+
+class _NeedsRoll(Exception):
+    pass
+
+def enumerate_rolls(create):
+    # Calls create() once for every distinct sequence of rolls it can end up
+    # consuming, yielding each result with the probability of its sequence.
+    pending = [()]
+    while pending:
+        rolls = pending.pop()
+        remaining = iter(rolls)
+
+        def _roller(slot):
+            for roll_val in remaining:
+                return roll_val
+            raise _NeedsRoll()
+
+        try:
+            with use_dice(_roller):
+                result = create()
+        except _NeedsRoll:
+            pending.extend(rolls + (roll_val, ) for roll_val in reversed(ROLL_PROBS))
+            continue
+
+        prob = 1.0
+        for roll_val in rolls:
+            prob *= ROLL_PROBS[roll_val]
+        yield prob, rolls, result
+
+
+def _probe_game(phase, ydline, rules):
+    game = Game.create("actor", "opponent", 1, rules, seed=0)
+    game.ball_carrier = game.team1
+    if phase == "kickoff":
+        game.setup_kickoff()
+    elif phase == "safety":
+        game.setup_safety_punt()
+    else:
+        game.ydline = 100 - ydline
+        game.setup_drive()
+    return game
+
+def effect(events, phase, ydline, rules):
+    game = _probe_game(phase, ydline, rules)
+    events.apply(game)
+
+    setup = game._setup_queue[-1].__name__[len("setup_"):]
+    if setup != "next_play":
+        game._resolve_queue()
+
+    return Effect(
+        setup,
+        game.ydline,
+        game.ball_carrier is game.team1,
+        game.team1.score,
+        game.team2.score,
+        tuple(event.TYPE for event in events.resolve()))
+
+def distribution(create, phase, ydline, rules):
+    dist = {}
+    for prob, rolls, events in enumerate_rolls(create):
+        outcome = effect(events, phase, ydline, rules)
+        dist[outcome] = dist.get(outcome, 0.0) + prob
+    return dist
+
+
+# Exact distributions of action effects, worked out by running the real event
+# code over every sequence of dice rolls. They're computed on first use and
+# cached, since each one only depends on the ruleset and a few small keys.
+class OutcomeTables:
+    _shared = weakref.WeakKeyDictionary()
+
+    # Working the distributions out takes a while, so everything using the
+    # same Ruleset in a process shares one set of tables.
+    @staticmethod
+    def for_rules(rules=None):
+        rules = rules or Ruleset.default()
+        if rules not in OutcomeTables._shared:
+            OutcomeTables._shared[rules] = OutcomeTables(rules)
+        return OutcomeTables._shared[rules]
+
+    def __init__(self, rules=None):
+        self.rules = rules or Ruleset.default()
+        self._special_teams = {}
+        self._plays = {}
+
+    def special_teams(self, action, ydline=None):
+        phase, fixed_ydline = SPECIAL_TEAMS[action]
+        ydline = fixed_ydline if fixed_ydline is not None else ydline
+
+        key = (action, ydline)
+        if key not in self._special_teams:
+            create = _CREATE[action]
+            self._special_teams[key] = distribution(lambda: create(ydline, self.rules), phase, ydline, self.rules)
+        return self._special_teams[key]
+
+    # Everything after contact depends only on where the play ended, so plays
+    # are keyed by that rather than by where they started.
+    def play(self, contact, play_end):
+        if contact == "touchdown":
+            play_end = 100
+        contact_key = (contact, play_end)
+
+        if contact_key not in self._plays:
+            def _create():
+                result, play_yds = PlayResult.create_result(contact, play_end, 0, self.rules)
+                return PlayResult(play_end, play_yds, result)
+            self._plays[contact_key] = distribution(_create, "play-selection", play_end, self.rules)
+        return self._plays[contact_key]
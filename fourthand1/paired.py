@@ -0,0 +1,71 @@
+import math
+import random
+from collections import namedtuple
+
+from fourthand1.cards import load_deck
+from fourthand1.tournament import play_game
+
+
+# "margins" are the point margins of each policy's games against the
+# opponent, game for game. "stderr" is the standard error of the mean
+# difference as measured, and "independent_stderr" what it would have been
+# had the two sets of games been played with unrelated dice.
+PairedResult = namedtuple("PairedResult", ("games", "mean_diff", "stderr", "independent_stderr", "margins"))
+
+
+# Rolls for one game that depend only on the seed, the game's index and the
+# event slot: the action in the game's history they're rolled for, the slot
+# (see events.roll_dice) and how many rolls that slot has already had during
+# the action. Two games given CommonDice with the same seed and index see the
+# same kick-off roll at the same point in the game, the same fumble
+# recoveries, the same PATs and so on, however differently they're played,
+# and a roll one game makes that the other doesn't leaves every later roll
+# of both alone.
+class CommonDice:
+    def __init__(self, seed, game_index):
+        self.seed = seed
+        self.game_index = game_index
+        self._action_index = 0
+        self._draws = {}
+
+    def start_action(self, action_index):
+        self._action_index = action_index
+        self._draws = {}
+
+    def __call__(self, slot):
+        draw = self._draws.get(slot, 0)
+        self._draws[slot] = draw + 1
+        stream = random.Random(f"{self.seed}/{self.game_index}/{self._action_index}/{slot}/{draw}")
+        return sum(stream.randint(1, 6) for k in range(3))
+
+
+def _variance(values):
+    mean = sum(values) / len(values)
+    return sum((value - mean) ** 2 for value in values) / (len(values) - 1)
+
+# Plays policy_a and policy_b against the same opponent, num_games each, and
+# estimates how many more points per game policy_a wins by. With common set,
+# the nth game of each is played from the same seed and the same dice
+# streams, so the luck of the dice largely cancels out of the difference and
+# far fewer games are needed for the same confidence.
+def compare(policy_a, policy_b, opponent, num_games, plays_per_quarter=15, seed=0, deck=None, common=True):
+    if num_games < 2:
+        raise ValueError("Comparing policies takes at least 2 games.")
+
+    deck = deck or load_deck()
+    margins_a, margins_b = [], []
+    for game_index in range(num_games):
+        for policy, margins, side in ((policy_a, margins_a, 0), (policy_b, margins_b, 1)):
+            game_seed = f"{seed}/{game_index}" if common else f"{seed}/{game_index}/{side}"
+            dice = CommonDice(seed if common else f"{seed}/{side}", game_index)
+            score, opp_score = play_game(
+                "candidate", policy, "opponent", opponent, plays_per_quarter, game_seed, deck, dice)
+            margins.append(score - opp_score)
+
+    diffs = [margin_a - margin_b for margin_a, margin_b in zip(margins_a, margins_b)]
+    return PairedResult(
+        num_games,
+        sum(diffs) / num_games,
+        math.sqrt(_variance(diffs) / num_games),
+        math.sqrt((_variance(margins_a) + _variance(margins_b)) / num_games),
+        list(zip(margins_a, margins_b)))
@@ -4,6 +4,7 @@ from fourthand1.cards.offense import OffenseCard, Catch, Pass, Run
 from fourthand1.cards.defense import DefenseCard
 from fourthand1.events import PlayResult
 from fourthand1.play._geo import catch_zone, defender_zone, path_segment
+from fourthand1.rules import Ruleset
 
 
 class Play:
@@ -11,14 +12,18 @@ class Play:
     def create(off_card, def_card, off_offset=0, def_offset=0):
         return Play(
             _OffensePlay.apply_offset(off_card, off_offset),
-            _DefensePlay.apply_offset(def_card, def_offset))
+            _DefensePlay.apply_offset(def_card, def_offset),
+            off_offset,
+            def_offset)
 
-    def __init__(self, off_play, def_play):
+    def __init__(self, off_play, def_play, off_offset=0, def_offset=0):
         self.off_play = off_play
         self.def_play = def_play
+        self.off_offset = off_offset
+        self.def_offset = def_offset
 
-    def run(self, from_ydline):
-        return PlayResult.create(from_ydline, self.off_play, self.def_play)
+    def run(self, from_ydline, rules=None):
+        return PlayResult.create(from_ydline, self.off_play, self.def_play, rules or Ruleset.default())
 
 
 class _OffensePlay(OffenseCard):
@@ -0,0 +1,204 @@
+import math
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from fourthand1.cards import load_deck
+from fourthand1.cards.defense import DefenseCard, Fumbler, Tackler
+from fourthand1.events import PlayResult
+from fourthand1.play import _DefensePlay, _OffensePlay
+from fourthand1.play._geo import defender_zone
+from fourthand1.play.matchups import OFFSETS
+
+
+# Where defenders may be placed: whole yards across, and half yards (the
+# middle of a yard) downfield, as on the existing cards. The field is 27
+# yards wide, and the range across leaves room for every offset.
+X_RANGE = (3, 24)
+Y_RANGE = (-5.5, 27.5)
+
+# The stats a layout can be aimed at, as in card_stats(): the share of
+# matchups ending in each contact, and the mean gain on tackles and fumbles.
+STATS = PlayResult.CONTACTS + ("mean_yds", )
+
+# How far off each stat counts as one unit of error: a yard of mean_yds
+# counts as much as five points of a rate.
+SCALES = {**{contact: 0.05 for contact in PlayResult.CONTACTS}, "mean_yds": 1.0}
+
+_CONTACT = {contact: code for code, contact in enumerate(PlayResult.CONTACTS)}
+_NO_CONTACT = np.iinfo(np.int16).max
+
+
+# Works out where the offense deck is stopped by any number of candidate
+# defense layouts at once, over every offense card and both sides' offsets,
+# the same way PlayResult.contact() would.
+#
+# A play is stopped by the first path segment that reaches any defender, and
+# within that segment by the first defender in card order (downfield, then
+# across). So for every offense play and every square a defender could stand
+# on, it's enough to know the first segment reaching that square and what
+# happens there, for a tackler and for a fumbler. Scoring a layout is then a
+# lookup per defender and a minimum, done in arrays for a whole batch of
+# layouts.
+class LayoutEvaluator:
+    def __init__(self, off_cards=None):
+        off_cards = off_cards or load_deck()[0]
+
+        # Every square, with room on either side for the defense's offset.
+        self.xs = list(range(X_RANGE[0] + OFFSETS[0], X_RANGE[1] + OFFSETS[-1] + 1))
+        self.ys = [Y_RANGE[0] + k for k in range(int(Y_RANGE[1] - Y_RANGE[0]) + 1)]
+        squares = [(x, y) for x in self.xs for y in self.ys]
+
+        plays = [_OffensePlay.apply_offset(card, offset) for card in off_cards for offset in OFFSETS]
+        self.first_segment = np.full((len(plays), len(squares)), _NO_CONTACT, dtype=np.int16)
+        self.contacts = np.zeros((2, len(plays), len(squares)), dtype=np.int8)
+        self.yds = np.zeros((2, len(plays), len(squares)), dtype=np.int16)
+
+        for play_index, play in enumerate(plays):
+            for square, coord in enumerate(squares):
+                zone = defender_zone(coord)
+                segment_index = next((index for index, segment in enumerate(play.path[1:]) if segment.rect.contains_square(zone)), None)
+                if segment_index is None:
+                    continue
+
+                self.first_segment[play_index, square] = segment_index
+                for fumbler, player_cls in enumerate((Tackler, Fumbler)):
+                    def_play = _DefensePlay("", "", "", [], [])
+                    player = player_cls(list(coord))
+                    player.rect = zone
+                    if fumbler:
+                        def_play.fumblers = [player]
+                    else:
+                        def_play.tacklers = [player]
+
+                    contact, yds = PlayResult.contact(play, def_play)
+                    self.contacts[fumbler, play_index, square] = _CONTACT[contact]
+                    self.yds[fumbler, play_index, square] = yds or 0
+
+    def square(self, x, y):
+        return self.xs.index(x) * len(self.ys) + self.ys.index(y)
+
+    def coord(self, square):
+        x_index, y_index = divmod(int(square), len(self.ys))
+        return self.xs[x_index], self.ys[y_index]
+
+    # Takes an (N, players) array of squares (see square()) and which
+    # players are fumblers, and returns an (N, len(STATS)) array of stats.
+    def evaluate(self, layouts, fumblers):
+        layouts = np.asarray(layouts, dtype=np.int64)
+        fumblers = np.asarray(fumblers, dtype=bool)
+
+        # Offsetting the defense moves every square over by a column.
+        shifts = np.array(OFFSETS) * len(self.ys)
+        squares = layouts[:, None, :] + shifts[None, :, None]
+
+        # Within a segment, the first defender in card order stops the play.
+        y_indexes = layouts % len(self.ys)
+        x_indexes = layouts // len(self.ys)
+        order = (y_indexes * len(self.xs) + x_indexes)[:, None, :]
+
+        segments = self.first_segment[:, squares].astype(np.int64)
+        first = np.argmin(segments * (len(self.xs) * len(self.ys)) + order, axis=-1)[..., None]
+        stopped = np.take_along_axis(segments, first, axis=-1)[..., 0] != _NO_CONTACT
+
+        kinds = fumblers.astype(np.int64)[None, None, None, :]
+        squares = np.broadcast_to(squares, segments.shape)
+        plays = np.arange(segments.shape[0])[:, None, None, None]
+        contacts = np.take_along_axis(self.contacts[kinds, plays, squares], first, axis=-1)[..., 0]
+        yds = np.take_along_axis(self.yds[kinds, plays, squares], first, axis=-1)[..., 0]
+        contacts = np.where(stopped, contacts, _CONTACT["touchdown"])
+
+        # Everything is now (offense play, layout, defense offset).
+        matchups = contacts.shape[0] * contacts.shape[2]
+        stats = np.empty((len(layouts), len(STATS)))
+        for code, contact in enumerate(PlayResult.CONTACTS):
+            stats[:, code] = (contacts == code).sum(axis=(0, 2)) / matchups
+
+        gains = (contacts == _CONTACT["tackle"]) | (contacts == _CONTACT["fumble"])
+        gain_counts = gains.sum(axis=(0, 2))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            stats[:, -1] = np.where(gain_counts, (yds * gains).sum(axis=(0, 2)) / gain_counts, np.nan)
+        return stats
+
+
+def stats_error(stats, targets):
+    error = np.zeros(len(stats))
+    for stat, target in targets.items():
+        error += ((stats[:, STATS.index(stat)] - target) / SCALES[stat]) ** 2
+    # A layout that never tackles anyone has no mean gain to compare.
+    return np.where(np.isnan(error), np.inf, error)
+
+
+BalanceResult = namedtuple("BalanceResult", ("card", "stats", "error", "evaluated", "seconds"))
+
+# Searches for a defense card whose stats against the offense deck come as
+# close as it can to the targets (a dict of any of STATS), by simulated
+# annealing over where the given number of tacklers and fumblers stand. Each
+# step moves one defender in each of `batch` copies of the current layout,
+# scores them all at once and moves to the best of them if it's an
+# improvement, or by chance if not, less often as the temperature drops
+# from temperatures[0] to temperatures[1].
+#
+# The search starts from random squares, or from the given DefenseCard's
+# layout (snapped to the grid).
+def optimize(targets, tacklers=10, fumblers=1, iterations=2000, batch=64, seed=0, evaluator=None, start=None,
+        card_id="CUSTOM", name="Custom", description="", temperatures=(1.0, 0.001)):
+    for stat in targets:
+        if stat not in STATS:
+            raise ValueError(f"Unknown stat {stat}; expected one of {', '.join(STATS)}.")
+
+    started = time.perf_counter()
+    evaluator = evaluator or LayoutEvaluator()
+    rng = np.random.default_rng(seed)
+
+    x_indexes = [evaluator.xs.index(x) for x in range(X_RANGE[0], X_RANGE[1] + 1)]
+    x_low, x_high = x_indexes[0], x_indexes[-1]
+    y_count = len(evaluator.ys)
+    fumbler_mask = np.array([False] * tacklers + [True] * fumblers)
+
+    if start:
+        players = start.tacklers + start.fumblers
+        fumbler_mask = np.array([isinstance(player, Fumbler) for player in players])
+        current = np.array([
+            min(max(evaluator.xs.index(round(player.x)), x_low), x_high) * y_count
+            + min(max(int(math.floor(player.y - Y_RANGE[0] + 0.5)), 0), y_count - 1)
+            for player in players])
+    else:
+        squares = [x_index * y_count + y_index for x_index in range(x_low, x_high + 1) for y_index in range(y_count)]
+        current = rng.choice(squares, size=tacklers + fumblers, replace=False)
+
+    current_stats = evaluator.evaluate(current[None, :], fumbler_mask)
+    current_error = stats_error(current_stats, targets)[0]
+    best, best_stats, best_error = current, current_stats[0], current_error
+    evaluated = 1
+
+    for step in range(iterations):
+        temperature = temperatures[0] * (temperatures[1] / temperatures[0]) ** (step / max(iterations - 1, 1))
+
+        candidates = np.repeat(current[None, :], batch, axis=0)
+        movers = rng.integers(0, len(current), size=batch)
+        rows = np.arange(batch)
+        x_index = np.clip(candidates[rows, movers] // y_count + rng.integers(-2, 3, size=batch), x_low, x_high)
+        y_index = np.clip(candidates[rows, movers] % y_count + rng.integers(-3, 4, size=batch), 0, y_count - 1)
+        candidates[rows, movers] = x_index * y_count + y_index
+
+        stats = evaluator.evaluate(candidates, fumbler_mask)
+        errors = stats_error(stats, targets)
+        # Two defenders can't share a square.
+        ordered = np.sort(candidates, axis=1)
+        errors[(ordered[:, 1:] == ordered[:, :-1]).any(axis=1)] = np.inf
+        evaluated += batch
+
+        choice = int(np.argmin(errors))
+        if errors[choice] < current_error or rng.random() < math.exp(-(errors[choice] - current_error) / temperature):
+            current, current_error = candidates[choice], errors[choice]
+            if current_error < best_error:
+                best, best_stats, best_error = current, stats[choice], current_error
+
+    coords = [evaluator.coord(square) for square in best]
+    card = DefenseCard.create(card_id, name, description, {
+        "tacklers": [list(coord) for coord, fumbler in zip(coords, fumbler_mask) if not fumbler],
+        "fumblers": [list(coord) for coord, fumbler in zip(coords, fumbler_mask) if fumbler]
+    })
+    return BalanceResult(card, dict(zip(STATS, (float(stat) for stat in best_stats))), float(best_error), evaluated, time.perf_counter() - started)
@@ -0,0 +1,159 @@
+from collections import namedtuple
+
+from fourthand1.cards import load_deck
+from fourthand1.outcomes import OutcomeTables
+from fourthand1.play.matchups import OFFSETS, MatchupTable
+from fourthand1.rules import Ruleset
+
+
+Situation = namedtuple("Situation", ("down", "distance", "ydline"))
+
+# The solved game for a situation. "offense" and "defense" map each
+# (card id, offset) call to how often to make it, leaving out calls that are
+# never made, and "value" is what the offense expects to gain per snap.
+Equilibrium = namedtuple("Equilibrium", ("value", "offense", "defense"))
+
+# A rough expected points model: having the ball at your own goal line is
+# worth FIELD_VALUE[0] points and at the opponent's FIELD_VALUE[1], linear in
+# between. Using up a down without making a first down costs DOWN_VALUE points
+# per down gone, and after a kick the receiving team is taken to start from
+# RETURN_YDLINE.
+FIELD_VALUE = (-1.0, 5.0)
+DOWN_VALUE = 0.5
+RETURN_YDLINE = 25
+
+def field_value(ydline):
+    return FIELD_VALUE[0] + (FIELD_VALUE[1] - FIELD_VALUE[0]) * ydline / 100
+
+# What an effect (see fourthand1.outcomes) is worth to the offense, measured
+# against where it stood before the snap.
+def expected_points_added(situation, effect):
+    value = effect.points - effect.opp_points
+    sign = 1 if effect.keeps_ball else -1
+
+    if effect.setup == "next_play":
+        if effect.ydline >= situation.ydline + situation.distance:
+            value += field_value(effect.ydline)
+        elif situation.down == 4:
+            # Turnover on downs.
+            value -= field_value(100 - effect.ydline)
+        else:
+            value += field_value(effect.ydline) - DOWN_VALUE * situation.down
+    elif effect.setup == "drive":
+        value += sign * field_value(effect.ydline)
+    else:
+        # The team with the ball is the one kicking it away.
+        value -= sign * field_value(RETURN_YDLINE)
+
+    return value - (field_value(situation.ydline) - DOWN_VALUE * (situation.down - 1))
+
+
+# Every snap is a zero-sum game between the offense's calls (card and offset)
+# and the defense's, with the payoff given by value(). The optimal mixed
+# strategies are found by linear programming, then cached per situation, so
+# asking again is a dictionary lookup.
+class PlayCallSolver:
+    def __init__(self, matchups=None, rules=None, value=expected_points_added):
+        self.matchups = matchups or MatchupTable.create(*load_deck())
+        self.rules = rules or Ruleset.default()
+        self.outcomes = OutcomeTables.for_rules(self.rules)
+        self.value = value
+
+        self.off_calls = [(card.id, offset) for card in self.matchups.off_cards for offset in OFFSETS]
+        self.def_calls = [(card.id, offset) for card in self.matchups.def_cards for offset in OFFSETS]
+        self._equilibria = {}
+
+    @staticmethod
+    def situation(game):
+        if game.phase != "play-selection":
+            raise ValueError(f"No play to call during {game.phase}.")
+        return Situation(game.down, game.first_down_ydline - game.ydline, game.ydline)
+
+    # Rows are offense calls and columns defense calls, in the order of
+    # off_calls and def_calls.
+    def payoffs(self, situation):
+        situation = Situation(*situation)
+
+        contact_values = {}
+        payoffs = []
+        for off_index in range(len(self.matchups.off_cards)):
+            for off_offset in OFFSETS:
+                row = []
+                for def_index in range(len(self.matchups.def_cards)):
+                    for def_offset in OFFSETS:
+                        contact, yds = self.matchups.contacts[self.matchups.index(off_index, def_index, off_offset, def_offset)]
+                        play_end = 100 if contact == "touchdown" else situation.ydline + yds
+                        if (contact, play_end) not in contact_values:
+                            dist = self.outcomes.play(contact, play_end)
+                            contact_values[contact, play_end] = sum(prob * self.value(situation, effect) for effect, prob in dist.items())
+                        row.append(contact_values[contact, play_end])
+                payoffs.append(row)
+        return payoffs
+
+    def solve(self, situation):
+        situation = Situation(*situation)
+        if situation not in self._equilibria:
+            value, off_mix, def_mix = solve_zero_sum(self.payoffs(situation))
+            self._equilibria[situation] = Equilibrium(
+                value,
+                {call: prob for call, prob in zip(self.off_calls, off_mix) if prob > 0},
+                {call: prob for call, prob in zip(self.def_calls, def_mix) if prob > 0})
+        return self._equilibria[situation]
+
+    def solve_game(self, game):
+        return self.solve(PlayCallSolver.situation(game))
+
+
+# Finds optimal mixed strategies for a zero-sum game, where the row player
+# gets payoffs[row][col] and wants it as high as possible. Returns the value of
+# the game and both players' strategies.
+#
+# With every payoff shifted to be positive, the column player's problem is
+#   maximize sum(y) subject to payoffs @ y <= 1, y >= 0
+# and the row player's strategy falls out of the same tableau as its dual.
+# Scaling both by the optimum turns them into the mixed strategies. The slack
+# variables give a feasible starting basis, and Bland's rule keeps the simplex
+# from cycling on the (very common) degenerate pivots.
+def solve_zero_sum(payoffs, tolerance=1e-8):
+    num_rows, num_cols = len(payoffs), len(payoffs[0])
+    shift = 1 - min(min(row) for row in payoffs)
+
+    # Columns are the y variables then the slacks, with the right hand side
+    # last. The objective row holds reduced costs, negated.
+    tableau = [
+        [payoff + shift for payoff in row] + [1.0 if slack == row_index else 0.0 for slack in range(num_rows)] + [1.0]
+        for row_index, row in enumerate(payoffs)]
+    objective = [-1.0] * num_cols + [0.0] * num_rows + [0.0]
+    basis = [num_cols + row for row in range(num_rows)]
+
+    while True:
+        entering = next((col for col in range(num_cols + num_rows) if objective[col] < -tolerance), None)
+        if entering is None:
+            break
+
+        leaving, best_ratio = None, None
+        for row in range(num_rows):
+            coef = tableau[row][entering]
+            if coef > tolerance:
+                ratio = max(tableau[row][-1], 0.0) / coef
+                if best_ratio is None or ratio < best_ratio - tolerance or (ratio <= best_ratio + tolerance and basis[row] < basis[leaving]):
+                    leaving, best_ratio = row, ratio
+
+        pivot_row = tableau[leaving]
+        pivot = pivot_row[entering]
+        pivot_row[:] = [value / pivot for value in pivot_row]
+        for row in tableau + [objective]:
+            if row is not pivot_row:
+                factor = row[entering]
+                if factor != 0.0:
+                    row[:] = [value - factor * pivot_value for value, pivot_value in zip(row, pivot_row)]
+        basis[leaving] = entering
+
+    col_mix = [0.0] * num_cols
+    for row, var in enumerate(basis):
+        if var < num_cols:
+            col_mix[var] = max(tableau[row][-1], 0.0)
+    row_mix = [max(objective[num_cols + row], 0.0) for row in range(num_rows)]
+
+    col_total, row_total = sum(col_mix), sum(row_mix)
+    return 1 / objective[-1] - shift, [prob / row_total for prob in row_mix], [prob / col_total for prob in col_mix]
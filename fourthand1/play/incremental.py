@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from os.path import join
+
+from fourthand1.cards import CARDS_DIR, _card_sort_key
+from fourthand1.cards.defense import DefenseCard
+from fourthand1.cards.offense import OffenseCard
+from fourthand1.events import PlayResult
+from fourthand1.play import _DefensePlay, _OffensePlay
+from fourthand1.play.matchups import OFFSETS, MatchupTable
+
+
+_SIDES = {
+    "offense": (OffenseCard, _OffensePlay),
+    "defense": (DefenseCard, _DefensePlay)
+}
+
+def card_stats(contacts):
+    if not contacts:
+        return {}
+
+    counts = Counter(contact for contact, yds in contacts)
+    gains = [yds for contact, yds in contacts if contact in ("tackle", "fumble")]
+    stats = {contact: counts[contact] / len(contacts) for contact in PlayResult.CONTACTS}
+    stats["mean_yds"] = sum(gains) / len(gains) if gains else None
+    return stats
+
+
+# Keeps the matchup table for a card directory up to date as cards are
+# edited. Cards are keyed by a hash of their file, and the contacts of every
+# offset combination by the hashes of both cards, so refresh() only loads the
+# cards whose files changed and only works out their rows (or columns).
+# Contacts are only kept for the cards in the directory, so a long session of
+# edits doesn't pile up rows for every version of every card.
+class IncrementalMatchups:
+    def __init__(self, cards_dir=CARDS_DIR):
+        self.cards_dir = cards_dir
+        self.off_cards = []
+        self.def_cards = []
+
+        self._entries = {side: {} for side in _SIDES}
+        self._contacts = {}
+        self._hashes = ([], [])
+
+    @staticmethod
+    def content_hash(data):
+        return hashlib.sha1(data).hexdigest()
+
+    def _load_side(self, side):
+        card_cls, play_cls = _SIDES[side]
+        card_dir = join(self.cards_dir, side)
+
+        entries, changed = {}, []
+        for filename in os.listdir(card_dir):
+            if not filename.endswith(".json"):
+                continue
+
+            filepath = join(card_dir, filename)
+            with open(filepath, "rb") as card_file:
+                data = card_file.read()
+            digest = IncrementalMatchups.content_hash(data)
+
+            entry = self._entries[side].get(filepath)
+            if entry is None or entry[0] != digest:
+                card = card_cls.create(**json.loads(data))
+                entry = (digest, card, [play_cls.apply_offset(card, offset) for offset in OFFSETS])
+                changed.append(card.id)
+            entries[filepath] = entry
+
+        changed += [entry[1].id for filepath, entry in self._entries[side].items() if filepath not in entries]
+        return entries, changed
+
+    # Returns the ids of the cards that were added, changed or removed. If a
+    # card can't be loaded (say, it's halfway through being saved), nothing
+    # is updated.
+    def refresh(self):
+        off_entries, off_changed = self._load_side("offense")
+        def_entries, def_changed = self._load_side("defense")
+        self._entries = {"offense": off_entries, "defense": def_entries}
+
+        off_entries = sorted(off_entries.values(), key=lambda entry: _card_sort_key(entry[1]))
+        def_entries = sorted(def_entries.values(), key=lambda entry: _card_sort_key(entry[1]))
+
+        contacts = {}
+        for off_hash, off_card, off_plays in off_entries:
+            for def_hash, def_card, def_plays in def_entries:
+                contacts[off_hash, def_hash] = self._contacts.get((off_hash, def_hash)) or [
+                    PlayResult.contact(off_play, def_play) for off_play in off_plays for def_play in def_plays]
+        self._contacts = contacts
+
+        self.off_cards = [entry[1] for entry in off_entries]
+        self.def_cards = [entry[1] for entry in def_entries]
+        self._hashes = ([entry[0] for entry in off_entries], [entry[0] for entry in def_entries])
+        return off_changed + def_changed
+
+    def table(self):
+        off_hashes, def_hashes = self._hashes
+        contacts = [
+            contact
+            for off_hash in off_hashes for def_hash in def_hashes
+            for contact in self._contacts[off_hash, def_hash]]
+        return MatchupTable(self.off_cards, self.def_cards, contacts)
+
+    # How often each kind of contact comes up for each card, over every
+    # opposing card and offset, along with the mean yards gained on tackles
+    # and fumbles.
+    def stats(self):
+        off_hashes, def_hashes = self._hashes
+        off_stats = {
+            card.id: card_stats([contact for def_hash in def_hashes for contact in self._contacts[off_hash, def_hash]])
+            for card, off_hash in zip(self.off_cards, off_hashes)}
+        def_stats = {
+            card.id: card_stats([contact for off_hash in off_hashes for contact in self._contacts[off_hash, def_hash]])
+            for card, def_hash in zip(self.def_cards, def_hashes)}
+        return off_stats, def_stats
+
+    # Calls on_change(changed card ids) after every refresh that found a
+    # change, checking every interval seconds until interrupted. Cards that
+    # fail to load, including files that go missing for a moment while an
+    # editor saves them, are passed to on_error, and tried again next time.
+    def watch(self, on_change, on_error=None, interval=0.25):
+        while True:
+            try:
+                changed = self.refresh()
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                if on_error is None:
+                    raise
+                on_error(exc)
+            else:
+                if changed:
+                    on_change(changed)
+            time.sleep(interval)
@@ -0,0 +1,48 @@
+from fourthand1.events import PlayResult
+from fourthand1.play import Play, _DefensePlay, _OffensePlay
+
+
+OFFSETS = (-2, -1, 0, 1, 2)
+
+
+# Every combination of offense card, defense card and offsets, along with
+# where that play is stopped. Matchups are stored flat, in the order
+# index() produces, so the table can be handed to array-based code as is.
+class MatchupTable:
+    @staticmethod
+    def create(off_cards, def_cards):
+        off_plays = [[_OffensePlay.apply_offset(card, offset) for offset in OFFSETS] for card in off_cards]
+        def_plays = [[_DefensePlay.apply_offset(card, offset) for offset in OFFSETS] for card in def_cards]
+
+        contacts = []
+        for off_card_plays in off_plays:
+            for def_card_plays in def_plays:
+                for off_play in off_card_plays:
+                    for def_play in def_card_plays:
+                        contacts.append(PlayResult.contact(off_play, def_play))
+        return MatchupTable(off_cards, def_cards, contacts)
+
+    def __init__(self, off_cards, def_cards, contacts):
+        self.off_cards = off_cards
+        self.def_cards = def_cards
+        self.contacts = contacts
+
+        self._off_index = {card.id: index for index, card in enumerate(off_cards)}
+        self._def_index = {card.id: index for index, card in enumerate(def_cards)}
+
+    def __len__(self):
+        return len(self.contacts)
+
+    def index(self, off_index, def_index, off_offset=0, def_offset=0):
+        num_offsets = len(OFFSETS)
+        matchup = off_index * len(self.def_cards) + def_index
+        return (matchup * num_offsets + off_offset - OFFSETS[0]) * num_offsets + def_offset - OFFSETS[0]
+
+    def card_index(self, off_card_id, def_card_id):
+        return self._off_index[off_card_id], self._def_index[def_card_id]
+
+    def contact(self, off_card_id, def_card_id, off_offset=0, def_offset=0):
+        return self.contacts[self.index(*self.card_index(off_card_id, def_card_id), off_offset, def_offset)]
+
+    def play(self, off_index, def_index, off_offset=0, def_offset=0):
+        return Play.create(self.off_cards[off_index], self.def_cards[def_index], off_offset, def_offset)
@@ -0,0 +1,362 @@
+import numbers
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+from fourthand1 import events as _events
+
+
+ACTIONS = ("kickoff", "onside", "safety_punt", "play", "punt_in_bounds", "punt_out_of_bounds", "field_goal")
+
+# Every type of event there is, each given a bit in a logged action's event
+# mask.
+EVENT_TYPES = tuple(sorted({
+    cls.TYPE for cls in vars(_events).values()
+    if isinstance(cls, type) and issubclass(cls, _events._Event) and hasattr(cls, "TYPE")}))
+
+_ACTION = {action: code for code, action in enumerate(ACTIONS)}
+_EVENT_BIT = {event_type: 1 << bit for bit, event_type in enumerate(EVENT_TYPES)}
+
+# Columns of a log, and their numpy types once frozen. Everything is from the
+# point of view of the team with the ball before the action (the kicking team,
+# for kicks):
+#   down, distance: 0 for kicks
+#   ydline: the line of scrimmage, or where the kick is from
+#   off_card, def_card: indexes into the log's card ids, or -1 for kicks
+#   yds: the yardage of the first event (the gain at the point of contact, for
+#     plays from scrimmage; see StatsShard)
+#   points, opp_points: scored by each side during the action
+#   turnover: the offense lost the ball on a play from scrimmage (interception,
+#     lost fumble or downs) without scoring. Always 0 for kicks.
+#   events: a mask of the EVENT_TYPES that came up
+COLUMNS = (
+    ("action", "b", np.int8),
+    ("down", "b", np.int8),
+    ("distance", "h", np.int16),
+    ("ydline", "h", np.int16),
+    ("quarter", "b", np.int8),
+    ("off_card", "h", np.int16),
+    ("def_card", "h", np.int16),
+    ("yds", "h", np.int16),
+    ("points", "b", np.int8),
+    ("opp_points", "b", np.int8),
+    ("turnover", "b", np.int8),
+    ("events", "q", np.int64)
+)
+
+
+# Play-by-play, one row per action (coin flips aside), kept as columns so
+# that it can be frozen into numpy arrays and indexed without going back
+# through Python objects. Logs from many workers can be combined with
+# extend().
+class PlayLog:
+    @staticmethod
+    def load(filepath):
+        with np.load(filepath) as log_file:
+            log = PlayLog()
+            log.card_ids = [str(card_id) for card_id in log_file["card_ids"]]
+            log._card_codes = {card_id: code for code, card_id in enumerate(log.card_ids)}
+            for name, typecode, dtype in COLUMNS:
+                log._columns[name].extend(log_file[name].astype(dtype).tolist())
+            return log
+
+    def __init__(self):
+        self.card_ids = []
+        self._card_codes = {}
+        self._columns = {name: array(typecode) for name, typecode, dtype in COLUMNS}
+
+    def __len__(self):
+        return len(self._columns["action"])
+
+    def _card_code(self, card_id):
+        code = self._card_codes.get(card_id)
+        if code is None:
+            code = self._card_codes[card_id] = len(self.card_ids)
+            self.card_ids.append(card_id)
+        return code
+
+    def perform(self, game, action, *args):
+        if action == "coin_flip":
+            return getattr(game, action)(*args)
+
+        carrier = game.ball_carrier
+        opponent = game.opponent(carrier)
+        scores = carrier.score, opponent.score
+        row = {
+            "action": _ACTION[action],
+            "down": game.down or 0,
+            "distance": 0 if game.first_down_ydline is None else game.first_down_ydline - game.ydline,
+            "ydline": game.ydline,
+            "quarter": game.quarter,
+            "off_card": -1,
+            "def_card": -1
+        }
+        if action == "play":
+            play = args[0]
+            row["off_card"] = self._card_code(play.off_play.id)
+            row["def_card"] = self._card_code(play.def_play.id)
+
+        events = getattr(game, action)(*args) or []
+
+        row["yds"] = (events[0].yds or 0) if events else 0
+        row["points"] = carrier.score - scores[0]
+        row["opp_points"] = opponent.score - scores[1]
+        row["turnover"] = action == "play" and game.ball_carrier is not carrier and row["points"] == 0
+        row["events"] = 0
+        for event in events:
+            row["events"] |= _EVENT_BIT[event.TYPE]
+
+        for name, column in self._columns.items():
+            column.append(row[name])
+        return events
+
+    def extend(self, log):
+        card_codes = np.array([self._card_code(card_id) for card_id in log.card_ids] + [-1], dtype=np.int16)
+        for name, column in self._columns.items():
+            if name in ("off_card", "def_card"):
+                # -1 picks the last entry, which keeps it -1.
+                column.extend(card_codes[np.frombuffer(log._columns[name], dtype=np.int16)].tolist())
+            else:
+                column.extend(log._columns[name])
+
+    def columns(self):
+        return {name: np.frombuffer(self._columns[name], dtype=dtype) if len(self) else np.zeros(0, dtype=dtype) for name, typecode, dtype in COLUMNS}
+
+    def dump(self, filepath):
+        np.savez_compressed(filepath, card_ids=np.array(self.card_ids, dtype=str), **self.columns())
+
+
+# np.unique(rows, axis=0), but with each row packed into a single integer
+# first where the values allow, since sorting integers is many times faster
+# than sorting rows.
+def _unique_rows(rows):
+    if not len(rows):
+        return rows, np.zeros(0, dtype=np.int64)
+
+    lows = rows.min(axis=0).astype(np.int64)
+    spans = rows.max(axis=0).astype(np.int64) - lows + 1
+    if sum(int(span).bit_length() for span in spans) > 62:
+        keys, inverse = np.unique(rows, axis=0, return_inverse=True)
+        return keys, inverse.reshape(-1)
+
+    packed = np.zeros(len(rows), dtype=np.int64)
+    for column, (low, span) in enumerate(zip(lows, spans)):
+        packed = packed * span + (rows[:, column] - low)
+    packed, inverse = np.unique(packed, return_inverse=True)
+
+    keys = np.empty((len(packed), rows.shape[1]), dtype=rows.dtype)
+    for column in reversed(range(rows.shape[1])):
+        packed, keys[:, column] = np.divmod(packed, spans[column])
+        keys[:, column] += lows[column]
+    return keys, inverse.reshape(-1)
+
+def _sum_by(inverse, values, size):
+    return np.stack([
+        np.bincount(inverse, weights=values[:, column], minlength=size).round().astype(np.int64)
+        for column in range(values.shape[1])], axis=1).reshape(size, values.shape[1])
+
+
+KEYS = ("action", "down", "distance", "ydline", "quarter", "off_card", "def_card")
+
+# "yds" maps each yardage to how many times it came up. The rates are per
+# action, and turnovers only count plays from scrimmage. "events" maps each
+# event type to the share of actions it came up in.
+Summary = namedtuple("Summary", ("plays", "yds", "mean_yds", "turnover_rate", "scoring_rate", "opp_scoring_rate", "points_per_play", "events"))
+
+
+# Aggregates logged actions by situation: the action, down, distance, yard
+# line (in buckets of ydline_bucket yards), quarter and cards. Only counts are
+# kept for each situation that's come up, along with how often each yardage
+# did, so the index's size depends on how many distinct situations there are,
+# not how many actions were logged, and a query is a handful of vectorized
+# passes over the situations rather than a scan of the log. Logs too big to
+# hold at once can be added a piece at a time.
+class SituationIndex:
+    VERSION = 1
+
+    _COUNTERS = ("plays", "yds", "turnovers", "scores", "opp_scores", "points")
+
+    @staticmethod
+    def build(log, ydline_bucket=10):
+        index = SituationIndex(ydline_bucket)
+        index.add(log)
+        return index
+
+    @staticmethod
+    def load(filepath):
+        with np.load(filepath) as index_file:
+            if int(index_file["version"]) != SituationIndex.VERSION:
+                raise ValueError(f"Unsupported situation index version: {int(index_file['version'])}")
+            if tuple(index_file["event_types"]) != EVENT_TYPES:
+                raise ValueError("The situation index was built with different event types.")
+
+            index = SituationIndex(int(index_file["ydline_bucket"]))
+            index.card_ids = [str(card_id) for card_id in index_file["card_ids"]]
+            index._card_codes = {card_id: code for code, card_id in enumerate(index.card_ids)}
+            index.keys = index_file["keys"]
+            index.counters = index_file["counters"]
+            index.event_counts = index_file["event_counts"]
+            index.yds_cells = index_file["yds_cells"]
+            index.yds_values = index_file["yds_values"]
+            index.yds_counts = index_file["yds_counts"]
+            return index
+
+    def __init__(self, ydline_bucket=10):
+        self.ydline_bucket = ydline_bucket
+        self.card_ids = []
+        self._card_codes = {}
+
+        # One row per situation, with its values in KEYS order, and the
+        # counts for each situation by _COUNTERS and by EVENT_TYPES.
+        self.keys = np.zeros((0, len(KEYS)), dtype=np.int32)
+        self.counters = np.zeros((0, len(SituationIndex._COUNTERS)), dtype=np.int64)
+        self.event_counts = np.zeros((0, len(EVENT_TYPES)), dtype=np.int64)
+
+        # How many times each yardage came up in each situation, as rows of
+        # (situation, yardage, count).
+        self.yds_cells = np.zeros(0, dtype=np.int64)
+        self.yds_values = np.zeros(0, dtype=np.int16)
+        self.yds_counts = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def plays(self):
+        return int(self.counters[:, 0].sum())
+
+    def add(self, log):
+        columns = log.columns()
+        if not len(columns["action"]):
+            return
+
+        card_codes = np.array([self._card_codes.setdefault(card_id, len(self._card_codes)) for card_id in log.card_ids] + [-1], dtype=np.int32)
+        self.card_ids = sorted(self._card_codes, key=self._card_codes.get)
+
+        keys = np.stack([
+            columns["action"],
+            columns["down"],
+            columns["distance"],
+            columns["ydline"] // self.ydline_bucket,
+            columns["quarter"],
+            card_codes[columns["off_card"]],
+            card_codes[columns["def_card"]]
+        ], axis=1).astype(np.int32)
+
+        points = columns["points"].astype(np.int64)
+        counters = np.stack([
+            np.ones(len(keys), dtype=np.int64),
+            columns["yds"].astype(np.int64),
+            columns["turnover"].astype(np.int64),
+            (points > 0).astype(np.int64),
+            (columns["opp_points"] > 0).astype(np.int64),
+            points
+        ], axis=1)
+        event_counts = np.stack([columns["events"] >> bit & 1 for bit in range(len(EVENT_TYPES))], axis=1)
+
+        offset = len(self.keys)
+        self._combine(
+            np.concatenate([self.keys, keys]),
+            np.concatenate([self.counters, counters]),
+            np.concatenate([self.event_counts, event_counts]),
+            np.concatenate([self.yds_cells, np.arange(offset, offset + len(keys))]),
+            np.concatenate([self.yds_values, columns["yds"]]),
+            np.concatenate([self.yds_counts, np.ones(len(keys), dtype=np.int64)]))
+
+    # Folds rows with the same key into one, and the yardage rows with them.
+    def _combine(self, keys, counters, event_counts, yds_cells, yds_values, yds_counts):
+        keys, inverse = _unique_rows(keys)
+
+        self.keys = keys
+        self.counters = _sum_by(inverse, counters, len(keys))
+        self.event_counts = _sum_by(inverse, event_counts, len(keys))
+
+        yds_keys, yds_inverse = _unique_rows(np.stack([inverse[yds_cells], yds_values.astype(np.int64)], axis=1))
+        self.yds_cells = yds_keys[:, 0]
+        self.yds_values = yds_keys[:, 1].astype(np.int16)
+        self.yds_counts = _sum_by(yds_inverse, yds_counts[:, None], len(yds_keys))[:, 0]
+
+    def update(self, index):
+        if index.ydline_bucket != self.ydline_bucket:
+            raise ValueError(f"Can't combine indexes with {self.ydline_bucket} and {index.ydline_bucket} yard buckets.")
+
+        card_codes = np.array([self._card_codes.setdefault(card_id, len(self._card_codes)) for card_id in index.card_ids] + [-1], dtype=np.int32)
+        self.card_ids = sorted(self._card_codes, key=self._card_codes.get)
+
+        keys = index.keys.copy()
+        for column in (KEYS.index("off_card"), KEYS.index("def_card")):
+            keys[:, column] = card_codes[keys[:, column]]
+
+        self._combine(
+            np.concatenate([self.keys, keys]),
+            np.concatenate([self.counters, index.counters]),
+            np.concatenate([self.event_counts, index.event_counts]),
+            np.concatenate([self.yds_cells, index.yds_cells + len(self.keys)]),
+            np.concatenate([self.yds_values, index.yds_values]),
+            np.concatenate([self.yds_counts, index.yds_counts]))
+
+    def _codes(self, key, value):
+        if key == "action":
+            return _ACTION.get(value, -1)
+        elif key in ("off_card", "def_card"):
+            return self._card_codes.get(value, -2)
+        elif key == "ydline":
+            return value // self.ydline_bucket
+        return value
+
+    # Each filter is either a single value, or a collection (a range, say) of
+    # values any of which will do, with None meaning any value at all. Cards
+    # are given by id. Yard lines are matched by bucket, so a range of them
+    # takes in the whole of every bucket it touches.
+    #
+    #   index.query(action="play", down=4, distance=range(1, 3), ydline=range(60, 100))
+    def query(self, **filters):
+        mask = np.ones(len(self.keys), dtype=bool)
+        for key, value in filters.items():
+            if key not in KEYS:
+                raise ValueError(f"Can't filter on {key}; expected one of {', '.join(KEYS)}.")
+            elif value is None:
+                continue
+
+            column = self.keys[:, KEYS.index(key)]
+            if isinstance(value, (str, numbers.Integral)):
+                mask &= column == self._codes(key, value)
+            else:
+                mask &= np.isin(column, list({self._codes(key, item) for item in value}))
+
+        return self._summarize(mask)
+
+    def _summarize(self, mask):
+        plays, yds, turnovers, scores, opp_scores, points = (int(total) for total in self.counters[mask].sum(axis=0))
+        event_totals = self.event_counts[mask].sum(axis=0)
+
+        rows = mask[self.yds_cells]
+        values, inverse = np.unique(self.yds_values[rows], return_inverse=True)
+        counts = np.bincount(inverse.reshape(-1), weights=self.yds_counts[rows], minlength=len(values))
+
+        if not plays:
+            return Summary(0, {}, None, None, None, None, None, {})
+        return Summary(
+            plays,
+            {int(value): int(count) for value, count in zip(values, counts)},
+            yds / plays,
+            turnovers / plays,
+            scores / plays,
+            opp_scores / plays,
+            points / plays,
+            {event_type: int(total) / plays for event_type, total in zip(EVENT_TYPES, event_totals) if total})
+
+    def dump(self, filepath):
+        np.savez_compressed(
+            filepath,
+            version=SituationIndex.VERSION,
+            ydline_bucket=self.ydline_bucket,
+            event_types=np.array(EVENT_TYPES, dtype=str),
+            card_ids=np.array(self.card_ids, dtype=str),
+            keys=self.keys,
+            counters=self.counters,
+            event_counts=self.event_counts,
+            yds_cells=self.yds_cells,
+            yds_values=self.yds_values,
+            yds_counts=self.yds_counts)
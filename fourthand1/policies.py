@@ -0,0 +1,112 @@
+import abc
+
+from fourthand1.decisions import Decision, situation_key
+from fourthand1.play.matchups import OFFSETS
+
+
+# A play-calling policy decides for one team. action() is asked for the name
+# of the next action whenever the team has the ball or is kicking it, and must
+# pick one of game.action_names. For plays, offense() picks the offense card
+# and offset and the other team's defense() picks the defense card and offset.
+# Every choice is given the game's Random, so policies that roll their own
+# choices stay reproducible.
+class Policy(abc.ABC):
+    @abc.abstractmethod
+    def action(self, game, rng):
+        pass
+
+    def offense(self, game, off_cards, rng):
+        return rng.choice(off_cards), rng.choice(OFFSETS)
+
+    def defense(self, game, def_cards, rng):
+        return rng.choice(def_cards), rng.choice(OFFSETS)
+
+
+class RandomPolicy(Policy):
+    def action(self, game, rng):
+        return rng.choice(sorted(game.action_names))
+
+
+# Always kicks off normally, runs plays on the first three downs, and on
+# fourth down goes for it when it's short, kicks a field goal when it's in
+# range and punts otherwise.
+class ConservativePolicy(Policy):
+    def __init__(self, go_for_it_distance=1):
+        self.go_for_it_distance = go_for_it_distance
+
+    def action(self, game, rng):
+        names = game.action_names
+        if "kickoff" in names:
+            return "kickoff"
+        elif "play" not in names:
+            return next(iter(names))
+        elif game.down < 4 or game.first_down_ydline - game.ydline <= self.go_for_it_distance:
+            return "play"
+        elif "field_goal" in names:
+            return "field_goal"
+        return "punt_in_bounds"
+
+
+# Plays like ConservativePolicy, but calls plays by sampling from the solved
+# equilibrium for the situation (see fourthand1.play.equilibrium).
+class EquilibriumPolicy(ConservativePolicy):
+    def __init__(self, go_for_it_distance=1):
+        super().__init__(go_for_it_distance)
+        self._solver = None
+
+    @property
+    def solver(self):
+        if self._solver is None:
+            from fourthand1.play.equilibrium import PlayCallSolver
+
+            self._solver = PlayCallSolver()
+        return self._solver
+
+    def _sample(self, mix, cards, rng):
+        calls = sorted(mix)
+        card_id, offset = rng.choices(calls, weights=[mix[call] for call in calls])[0]
+        return next(card for card in cards if card.id == card_id), offset
+
+    def offense(self, game, off_cards, rng):
+        return self._sample(self.solver.solve_game(game).offense, off_cards, rng)
+
+    def defense(self, game, def_cards, rng):
+        return self._sample(self.solver.solve_game(game).defense, def_cards, rng)
+
+
+# Plays like EquilibriumPolicy, but decides what to do on every down by
+# comparing the points it expects from running a play (at equilibrium) with
+# those from each kick it's allowed. Given a DecisionCache (see
+# fourthand1.decisions), decisions are looked up by situation first.
+class ExpectedValuePolicy(EquilibriumPolicy):
+    def __init__(self, cache=None):
+        super().__init__()
+        self.cache = cache
+
+    def decide(self, game):
+        from fourthand1.play.equilibrium import expected_points_added
+
+        situation = self.solver.situation(game)
+        values = {}
+        for name in sorted(game.action_names):
+            if name == "play":
+                values[name] = self.solver.solve(situation).value
+            else:
+                dist = self.solver.outcomes.special_teams(name, game.ydline)
+                values[name] = sum(prob * expected_points_added(situation, effect) for effect, prob in dist.items())
+
+        action = max(values, key=values.get)
+        return Decision(action, values[action])
+
+    # decide() only reads the down, distance and yard line (and the phase,
+    # for the actions allowed), so the clock and score are left out of the
+    # key rather than splitting decisions that come out the same.
+    def situation_key(self, game):
+        return situation_key(game)._replace(quarter=None, playnum=None, lead=None)
+
+    def action(self, game, rng):
+        if game.phase != "play-selection":
+            return super().action(game, rng)
+        elif self.cache is None:
+            return self.decide(game).action
+        return self.cache.lookup(self.situation_key(game), lambda: self.decide(game)).action
@@ -0,0 +1,225 @@
+import argparse
+import cProfile
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from fourthand1.cards import load_deck
+from fourthand1.events import get_outcome
+from fourthand1.play import Play
+from fourthand1.play._geo import Rect
+from fourthand1.play.matchups import OFFSETS
+from fourthand1.policies import RandomPolicy
+from fourthand1.tournament import run_game
+
+
+SPECIAL_TEAMS_ACTIONS = frozenset(("punt_in_bounds", "punt_out_of_bounds", "field_goal"))
+
+# Plays at random, but never runs a play when it can kick instead.
+class SpecialTeamsPolicy(RandomPolicy):
+    def action(self, game, rng):
+        names = game.action_names & SPECIAL_TEAMS_ACTIONS
+        return rng.choice(sorted(names)) if names else super().action(game, rng)
+
+# Each scenario takes a seeded Random and the deck, and does a fixed amount of
+# representative work.
+def resolve_all_plays(pick, off_cards, def_cards):
+    for off_card in off_cards:
+        for def_card in def_cards:
+            for off_offset in OFFSETS:
+                for def_offset in OFFSETS:
+                    play = Play.create(off_card, def_card, off_offset, def_offset)
+                    play.run(pick.randint(1, 99)).resolve()
+
+def special_teams_games(pick, off_cards, def_cards):
+    policy = SpecialTeamsPolicy()
+    for game_num in range(50):
+        run_game("Home", policy, "Away", policy, 15, pick.getrandbits(64), (off_cards, def_cards))
+
+def full_games(pick, off_cards, def_cards):
+    policy = RandomPolicy()
+    for game_num in range(20):
+        run_game("Home", policy, "Away", policy, 15, pick.getrandbits(64), (off_cards, def_cards))
+
+SCENARIOS = {
+    "plays": resolve_all_plays,
+    "special-teams": special_teams_games,
+    "games": full_games
+}
+
+# Always reported, however they rank: the overlap test run for every path
+# segment against every defender, the roll on every outcome table, and
+# building each play from its cards.
+KEY_FUNCTIONS = (Rect.contains_square, get_outcome, Play.create)
+
+
+def _function_name(filepath, name):
+    path, filename = os.path.split(filepath)
+    if filename == "__init__.py":
+        # Name the package, rather than leave every package's functions
+        # under the same file name.
+        filename = f"{os.path.basename(path)}/{filename}"
+    return f"{filename}:{name}"
+
+def _code_name(code):
+    return _function_name(code.co_filename, getattr(code, "co_qualname", code.co_name))
+
+def _frame_name(frame):
+    return _code_name(frame.f_code)
+
+# A statistical profiler: a background thread records the profiled thread's
+# stack every interval seconds. It only slows the profiled code down by the
+# cost of the samples, so the timings are closer to the real thing than
+# cProfile's, which makes every call slower. Stacks start below the function
+# that enabled the profiler.
+class SamplingProfiler:
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self._target = None
+        self._root = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enable(self):
+        self._target = threading.get_ident()
+        self._root = sys._getframe(1)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def disable(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None and frame is not self._root:
+                stack.append(_frame_name(frame))
+                top = frame.f_code
+                frame = frame.f_back
+            # Skip samples of the profiler shutting down.
+            if stack and top is not SamplingProfiler.disable.__code__:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def hot_functions(self):
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for name in set(stack):
+                total[name] += count
+        return own, total
+
+    def print_stats(self, sort="tottime", limit=25, stream=sys.stdout):
+        own, total = self.hot_functions()
+        num_samples = sum(self.stacks.values()) or 1
+        ranked = own if sort == "tottime" else total
+
+        print(f"{num_samples} samples, every {self.interval * 1000:g}ms", file=stream)
+        print(f"{'own %':>8} {'total %':>8}  function", file=stream)
+        for name, count in ranked.most_common(limit):
+            print(f"{100 * own[name] / num_samples:8.1f} {100 * total[name] / num_samples:8.1f}  {name}", file=stream)
+
+    def print_key_functions(self, functions=KEY_FUNCTIONS, stream=sys.stdout):
+        own, total = self.hot_functions()
+        num_samples = sum(self.stacks.values()) or 1
+
+        print(f"{'own %':>8} {'total %':>8}  key function", file=stream)
+        for function in functions:
+            name = _code_name(function.__code__)
+            print(f"{100 * own[name] / num_samples:8.1f} {100 * total[name] / num_samples:8.1f}  {name}", file=stream)
+
+    def write_collapsed(self, stream):
+        for stack, count in sorted(self.stacks.items()):
+            print(f"{';'.join(stack)} {count}", file=stream)
+
+
+def _pstats_name(func):
+    filename, lineno, name = func
+    return _function_name(filename, name)
+
+def print_cprofile_key_functions(stats, functions=KEY_FUNCTIONS, stream=sys.stdout):
+    print(f"{'calls':>9} {'tottime':>9} {'cumtime':>9}  key function", file=stream)
+    for function in functions:
+        code = function.__code__
+        calls, prim_calls, tottime, cumtime, callers = stats.stats.get((code.co_filename, code.co_firstlineno, code.co_name), (0, 0, 0.0, 0.0, {}))
+        print(f"{calls:>9} {tottime:>9.3f} {cumtime:>9.3f}  {_code_name(code)}", file=stream)
+
+# cProfile only knows each function's direct callers, so its "stacks" are
+# caller;callee pairs, weighted by the microseconds spent in the callee.
+def write_cprofile_collapsed(stats, stream):
+    for func, (calls, prim_calls, tottime, cumtime, callers) in sorted(stats.stats.items()):
+        for caller, caller_stats in callers.items():
+            caller_tottime = caller_stats[2]
+            weight = round(caller_tottime * 1000000)
+            if weight:
+                print(f"{_pstats_name(caller)};{_pstats_name(func)} {weight}", file=stream)
+
+def run(scenarios, profiler="cprofile", repeat=1, seed=0, interval=0.001):
+    off_cards, def_cards = load_deck()
+    prof = cProfile.Profile() if profiler == "cprofile" else SamplingProfiler(interval)
+
+    pick = random.Random(seed)
+    start = time.perf_counter()
+    prof.enable()
+    try:
+        for iteration in range(repeat):
+            for scenario in scenarios:
+                SCENARIOS[scenario](pick, off_cards, def_cards)
+    finally:
+        prof.disable()
+    return prof, time.perf_counter() - start
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(prog="python -m fourthand1.profile")
+    parser.add_argument("scenarios", nargs="*", help=f"Any of {', '.join(SCENARIOS)} (default: all of them).")
+    parser.add_argument("--profiler", choices=("cprofile", "sample"), default="cprofile")
+    parser.add_argument("--interval", type=float, default=0.001, help="Seconds between samples, with --profiler sample.")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sort", choices=("tottime", "cumtime"), default="tottime")
+    parser.add_argument("--limit", type=int, default=25)
+    parser.add_argument("--match", help="Only list functions matching this regular expression (cProfile only).")
+    parser.add_argument("--collapsed", help="Also write collapsed stacks here, for flamegraph.pl or speedscope.")
+
+    args = vars(parser.parse_args(args))
+    args["scenarios"] = args["scenarios"] or list(SCENARIOS)
+    for scenario in args["scenarios"]:
+        if scenario not in SCENARIOS:
+            parser.error(f"unknown scenario: {scenario}")
+    return args
+
+def main(args=None):
+    args = parse_args(args)
+
+    prof, elapsed = run(args["scenarios"], args["profiler"], args["repeat"], args["seed"], args["interval"])
+    print(f"Ran {', '.join(args['scenarios'])} in {elapsed:.2f}s")
+
+    if args["profiler"] == "cprofile":
+        stats = pstats.Stats(prof, stream=sys.stdout)
+        stats.sort_stats(args["sort"])
+        restrictions = [args["match"], args["limit"]] if args["match"] else [args["limit"]]
+        stats.print_stats(*restrictions)
+        print_cprofile_key_functions(stats)
+    else:
+        prof.print_stats(args["sort"], args["limit"])
+        print()
+        prof.print_key_functions()
+
+    if args["collapsed"]:
+        with open(args["collapsed"], "w") as collapsed_file:
+            if args["profiler"] == "cprofile":
+                write_cprofile_collapsed(stats, collapsed_file)
+            else:
+                prof.write_collapsed(collapsed_file)
+
+
+if __name__ == "__main__":
+    main()
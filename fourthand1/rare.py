@@ -0,0 +1,131 @@
+import math
+import random
+from collections import namedtuple
+
+from fourthand1.cards import load_deck
+from fourthand1.outcomes import ROLL_PROBS
+from fourthand1.tournament import run_game
+
+
+ROLLS = tuple(ROLL_PROBS)
+
+# "mean" is the (unbiased) estimate and "stderr" its standard error.
+# "effective_games" is how many plainly simulated games the weights are worth
+# (Kish's effective sample size), which drops as the weights spread out.
+Estimate = namedtuple("Estimate", ("games", "mean", "stderr", "effective_games"))
+
+
+# Rolls the given slots (see events.roll_dice) from a proposal that mixes the
+# real 3d6 odds with an even chance of every total, so a 3 or an 18 comes up
+# about mix / 16 of the time rather than 1 / 216. Every roll multiplies
+# weight by how much likelier it really was than the proposal made it, and
+# weighting each game's result by that keeps estimates unbiased. The real odds
+# stay in the mix so no roll is ever weighted by more than 1 / (1 - mix).
+# Other slots roll as usual.
+class ImportanceDice:
+    def __init__(self, rng, slots, mix=0.5):
+        self.rng = rng
+        self.slots = frozenset(slots)
+        self.weight = 1.0
+
+        self._proposal = [(1 - mix) * ROLL_PROBS[roll_val] + mix / len(ROLLS) for roll_val in ROLLS]
+        self._ratios = {roll_val: ROLL_PROBS[roll_val] / prob for roll_val, prob in zip(ROLLS, self._proposal)}
+        self._real = [ROLL_PROBS[roll_val] for roll_val in ROLLS]
+
+    def __call__(self, slot):
+        if slot not in self.slots:
+            return self.rng.choices(ROLLS, self._real)[0]
+
+        roll_val = self.rng.choices(ROLLS, self._proposal)[0]
+        self.weight *= self._ratios[roll_val]
+        return roll_val
+
+
+# Forces the first roll for one slot to the game's stratum, and rolls
+# everything else as usual. Played over every stratum equally often, games
+# weighted by len(ROLLS) times the real odds of their stratum average out to
+# exactly the real mix of first rolls, however rare some of them are.
+class StratifiedDice:
+    def __init__(self, rng, slot, stratum):
+        self.rng = rng
+        self.slot = slot
+        self.stratum = stratum
+        self.weight = len(ROLLS) * ROLL_PROBS[stratum]
+        self._forced = False
+        self._real = [ROLL_PROBS[roll_val] for roll_val in ROLLS]
+
+    def __call__(self, slot):
+        if slot == self.slot and not self._forced:
+            self._forced = True
+            return self.stratum
+        return self.rng.choices(ROLLS, self._real)[0]
+
+
+class PlainDice:
+    def __init__(self, rng):
+        self.rng = rng
+        self.weight = 1.0
+        self._real = [ROLL_PROBS[roll_val] for roll_val in ROLLS]
+
+    def __call__(self, slot):
+        return self.rng.choices(ROLLS, self._real)[0]
+
+
+# Estimates the expected value of measure(game, events) over games between
+# policy1 and policy2, where events is every event of the game in order.
+#
+# method is "plain" for ordinary simulation, "importance" to oversample the
+# extreme rolls of the given slots, or "stratified" to play every possible
+# first roll of the (single) given slot equally often. Stratified runs are
+# rounded up to a multiple of len(ROLLS) games, and their standard error comes
+# from the spread within each stratum (see _stratified_variance), not across
+# all the games, which would count the differences between strata as noise.
+def estimate(measure, policy1, policy2, num_games, plays_per_quarter=15, method="importance", slots=("kickoff_return", "punt_return"), mix=0.5, seed=0, deck=None):
+    if method == "stratified":
+        if len(slots) != 1:
+            raise ValueError("Stratified sampling takes exactly one slot.")
+        num_games = -(-num_games // len(ROLLS)) * len(ROLLS)
+    elif method not in ("importance", "plain"):
+        raise ValueError(f"Unknown sampling method: {method}")
+
+    deck = deck or load_deck()
+    weighted = []
+    weights = []
+    strata = {}
+    for game_index in range(num_games):
+        rng = random.Random(f"{seed}/{game_index}")
+        if method == "importance":
+            dice = ImportanceDice(rng, slots, mix)
+        elif method == "stratified":
+            dice = StratifiedDice(rng, slots[0], ROLLS[game_index % len(ROLLS)])
+        else:
+            dice = PlainDice(rng)
+
+        events = []
+        game = run_game("team1", policy1, "team2", policy2, plays_per_quarter, rng.getrandbits(64), deck, dice, events.extend)
+        value = measure(game, events)
+        weighted.append(dice.weight * value)
+        weights.append(dice.weight)
+        if method == "stratified":
+            strata.setdefault(dice.stratum, []).append(value)
+
+    mean = sum(weighted) / num_games
+    if method == "stratified":
+        mean_variance = _stratified_variance(strata)
+    else:
+        variance = sum((value - mean) ** 2 for value in weighted) / (num_games - 1) if num_games > 1 else 0.0
+        mean_variance = variance / num_games
+    return Estimate(num_games, mean, math.sqrt(mean_variance), sum(weights) ** 2 / sum(weight ** 2 for weight in weights))
+
+
+# The variance of a stratified estimate: each stratum's sample variance,
+# weighted by its probability squared over its number of games. A stratum
+# with only one game adds nothing, as a single plain game does.
+def _stratified_variance(strata):
+    variance = 0.0
+    for stratum, values in strata.items():
+        if len(values) > 1:
+            stratum_mean = sum(values) / len(values)
+            stratum_variance = sum((value - stratum_mean) ** 2 for value in values) / (len(values) - 1)
+            variance += ROLL_PROBS[stratum] ** 2 * stratum_variance / len(values)
+    return variance
@@ -0,0 +1,285 @@
+import bisect
+
+from fourthand1.cards import load_deck
+from fourthand1.game import PHASES, Game
+from fourthand1.play import Play
+from fourthand1.play.matchups import OFFSETS
+
+
+ACTIONS = ("coin_flip", "kickoff", "onside", "safety_punt", "play", "punt_in_bounds", "punt_out_of_bounds", "field_goal")
+
+_ACTION = {action: code for code, action in enumerate(ACTIONS)}
+_PHASE = {phase: code for code, phase in enumerate(PHASES)}
+
+def _write_varint(buffer, value):
+    if value < 0:
+        raise ValueError(f"Can't encode a negative number: {value}")
+
+    while value >= 0x80:
+        buffer.append(value & 0x7f | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def _read_varint(data, pos):
+    value, shift = 0, 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Replay data ends in the middle of a number.")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+# Yard lines can run past either end of the field, and are None before the
+# coin flip (as are downs during kicks), so these are zigzagged, with 0 kept
+# for None.
+def _write_optional_int(buffer, value):
+    _write_varint(buffer, 0 if value is None else (value << 1 ^ value >> 63) + 1)
+
+def _read_optional_int(data, pos):
+    value, pos = _read_varint(data, pos)
+    if value == 0:
+        return None, pos
+    value -= 1
+    return value >> 1 ^ -(value & 1), pos
+
+def _write_str(buffer, value):
+    encoded = value.encode("utf-8")
+    _write_varint(buffer, len(encoded))
+    buffer.extend(encoded)
+
+def _read_str(data, pos):
+    length, pos = _read_varint(data, pos)
+    if pos + length > len(data):
+        raise ValueError("Replay data ends in the middle of a string.")
+    return bytes(data[pos:pos + length]).decode("utf-8"), pos + length
+
+def _write_keyframe(buffer, state):
+    _write_varint(buffer, state["actions"])
+    _write_varint(buffer, _PHASE[state["phase"]])
+    _write_varint(buffer, state["quarter"])
+    _write_varint(buffer, state["playnum"])
+    # Each team slot is 0, 1 or 2, so all four fit in a byte.
+    _write_varint(buffer, ((state["ball_carrier"] * 3 + state["last_ball_carrier"]) * 3 + state["kicking"]) * 3 + state["offense"])
+    _write_optional_int(buffer, state["ydline"])
+    _write_optional_int(buffer, state["down"])
+    _write_optional_int(buffer, state["first_down_ydline"])
+    for score in state["scores"]:
+        _write_varint(buffer, score)
+    _write_varint(buffer, state["rolls"])
+
+def _read_keyframe(data, pos):
+    state = {}
+    state["actions"], pos = _read_varint(data, pos)
+    phase, pos = _read_varint(data, pos)
+    if phase >= len(PHASES):
+        raise ValueError(f"Unknown phase code in replay keyframe: {phase}")
+    state["phase"] = PHASES[phase]
+    state["quarter"], pos = _read_varint(data, pos)
+    state["playnum"], pos = _read_varint(data, pos)
+
+    teams, pos = _read_varint(data, pos)
+    if teams >= 3 ** 4:
+        raise ValueError("Invalid teams in replay keyframe.")
+    teams, state["offense"] = divmod(teams, 3)
+    teams, state["kicking"] = divmod(teams, 3)
+    state["ball_carrier"], state["last_ball_carrier"] = divmod(teams, 3)
+
+    state["ydline"], pos = _read_optional_int(data, pos)
+    state["down"], pos = _read_optional_int(data, pos)
+    state["first_down_ydline"], pos = _read_optional_int(data, pos)
+    score1, pos = _read_varint(data, pos)
+    score2, pos = _read_varint(data, pos)
+    state["scores"] = (score1, score2)
+    state["rolls"], pos = _read_varint(data, pos)
+
+    return state, pos
+
+
+# Since a game rolls all of its dice from its own seeded RNG, the seed, the
+# setup and the list of actions taken are all it takes to play the whole game
+# out again, event for event. The encoding keeps that down to about a byte per
+# special teams action and four per play: card ids go into a string table and
+# plays refer to them by index, and both offsets share a single byte.
+#
+# Layout, with every number a varint:
+#   MAGIC, VERSION, seed, plays_per_quarter, team1 name, team2 name,
+#   card id count, card ids, action count, actions, keyframe count, keyframes
+# where a string is its length followed by its UTF-8 bytes, and an action is
+# its code into ACTIONS, followed (for "play") by the offense card index, the
+# defense card index and the packed offsets.
+#
+# Keyframes (see Game.state) are in the order they were taken. Seeking
+# restores the last keyframe before the target and only plays the actions
+# after it. A keyframe doesn't store the RNG, only the number of dice rolled
+# so far, which the RNG is put back from along with the seed (as in
+# fourthand1.hibernate), so it takes about a dozen bytes.
+class Replay:
+    MAGIC = b"4th1"
+    VERSION = 1
+    KEYFRAME_INTERVAL = 32
+
+    @staticmethod
+    def record(game, keyframes=None):
+        if not isinstance(game.seed, int) or game.seed < 0:
+            raise ValueError(f"Only games with a non-negative integer seed can be replayed: {game.seed!r}")
+        if game.dice is not None:
+            raise ValueError("Games with their own dice can't be replayed.")
+        if game.history_start:
+            raise ValueError("Games restored without their history can't be replayed.")
+        if any(action[0] not in _ACTION for action in game.history):
+            raise ValueError("Only games played action by action can be replayed.")
+        return Replay(game.seed, game.team1.name, game.team2.name, game.plays_per_quarter, list(game.history), keyframes)
+
+    @staticmethod
+    def decode(data):
+        if bytes(data[:len(Replay.MAGIC)]) != Replay.MAGIC:
+            raise ValueError("Not a replay.")
+
+        pos = len(Replay.MAGIC)
+        version, pos = _read_varint(data, pos)
+        if version != Replay.VERSION:
+            raise ValueError(f"Unsupported replay version: {version}")
+
+        seed, pos = _read_varint(data, pos)
+        plays_per_quarter, pos = _read_varint(data, pos)
+        team1_name, pos = _read_str(data, pos)
+        team2_name, pos = _read_str(data, pos)
+
+        card_count, pos = _read_varint(data, pos)
+        card_ids = []
+        for index in range(card_count):
+            card_id, pos = _read_str(data, pos)
+            card_ids.append(card_id)
+
+        action_count, pos = _read_varint(data, pos)
+        actions = []
+        for index in range(action_count):
+            code, pos = _read_varint(data, pos)
+            if code >= len(ACTIONS):
+                raise ValueError(f"Unknown replay action code: {code}")
+
+            if ACTIONS[code] == "play":
+                off_index, pos = _read_varint(data, pos)
+                def_index, pos = _read_varint(data, pos)
+                offsets, pos = _read_varint(data, pos)
+                if max(off_index, def_index) >= len(card_ids) or offsets >= len(OFFSETS) ** 2:
+                    raise ValueError("Invalid play in replay.")
+                off_offset, def_offset = divmod(offsets, len(OFFSETS))
+                actions.append(("play", card_ids[off_index], card_ids[def_index], OFFSETS[off_offset], OFFSETS[def_offset]))
+            else:
+                actions.append((ACTIONS[code], ))
+
+        keyframe_count, pos = _read_varint(data, pos)
+        keyframes = []
+        for index in range(keyframe_count):
+            keyframe, pos = _read_keyframe(data, pos)
+            if keyframe["actions"] > len(actions) or (keyframes and keyframe["actions"] <= keyframes[-1]["actions"]):
+                raise ValueError("Replay keyframes are out of order.")
+            keyframes.append(keyframe)
+
+        if pos != len(data):
+            raise ValueError("Unexpected data after the end of the replay.")
+
+        return Replay(seed, team1_name, team2_name, plays_per_quarter, actions, keyframes)
+
+    def __init__(self, seed, team1_name, team2_name, plays_per_quarter, actions, keyframes=None):
+        self.seed = seed
+        self.team1_name = team1_name
+        self.team2_name = team2_name
+        self.plays_per_quarter = plays_per_quarter
+        self.actions = actions
+        self.keyframes = sorted(keyframes or [], key=lambda keyframe: keyframe["actions"])
+
+    def encode(self):
+        buffer = bytearray(Replay.MAGIC)
+        _write_varint(buffer, Replay.VERSION)
+        _write_varint(buffer, self.seed)
+        _write_varint(buffer, self.plays_per_quarter)
+        _write_str(buffer, self.team1_name)
+        _write_str(buffer, self.team2_name)
+
+        card_ids = {}
+        for action in self.actions:
+            if action[0] == "play":
+                card_ids.setdefault(action[1], len(card_ids))
+                card_ids.setdefault(action[2], len(card_ids))
+
+        _write_varint(buffer, len(card_ids))
+        for card_id in card_ids:
+            _write_str(buffer, card_id)
+
+        _write_varint(buffer, len(self.actions))
+        for action in self.actions:
+            _write_varint(buffer, _ACTION[action[0]])
+            if action[0] == "play":
+                name, off_card_id, def_card_id, off_offset, def_offset = action
+                if off_offset not in OFFSETS or def_offset not in OFFSETS:
+                    raise ValueError(f"Invalid play offsets: {off_offset}, {def_offset}")
+                _write_varint(buffer, card_ids[off_card_id])
+                _write_varint(buffer, card_ids[def_card_id])
+                _write_varint(buffer, OFFSETS.index(off_offset) * len(OFFSETS) + OFFSETS.index(def_offset))
+
+        _write_varint(buffer, len(self.keyframes))
+        for keyframe in self.keyframes:
+            _write_keyframe(buffer, keyframe)
+
+        return bytes(buffer)
+
+    def new_game(self, rules=None):
+        return Game.create(self.team1_name, self.team2_name, self.plays_per_quarter, rules, self.seed)
+
+    # Plays the whole game through once, keeping the state every interval
+    # actions (the start of the game included).
+    def index_keyframes(self, interval=KEYFRAME_INTERVAL, deck=None, rules=None):
+        game = self.new_game(rules)
+        off_cards, def_cards = _card_maps(deck)
+
+        keyframes = [game.state()]
+        for index, action in enumerate(self.actions, 1):
+            perform(game, action, off_cards, def_cards)
+            if index % interval == 0:
+                keyframes.append(game.state())
+        self.keyframes = keyframes
+
+    # Returns the game as it was after the first `index` actions.
+    def seek(self, index, deck=None, rules=None):
+        if not 0 <= index <= len(self.actions):
+            raise ValueError(f"Can't seek to action {index} of {len(self.actions)}.")
+
+        game = self.new_game(rules)
+        start = 0
+        keyframe_index = bisect.bisect_right([keyframe["actions"] for keyframe in self.keyframes], index)
+        if keyframe_index:
+            keyframe = self.keyframes[keyframe_index - 1]
+            start = keyframe["actions"]
+            game.restore(keyframe, self.actions[:start])
+
+        off_cards, def_cards = _card_maps(deck)
+        for action in self.actions[start:index]:
+            perform(game, action, off_cards, def_cards)
+        return game
+
+    # Yields each action along with the events it produced (None for the coin
+    # flip), from the `start`th action on. The game has to be played with the
+    # same rules and cards as the original for the events to match.
+    def replay(self, start=0, deck=None, rules=None):
+        deck = deck or load_deck()
+        game = self.seek(start, deck, rules)
+        off_cards, def_cards = _card_maps(deck)
+
+        for action in self.actions[start:]:
+            yield action, perform(game, action, off_cards, def_cards)
+
+def _card_maps(deck):
+    off_cards, def_cards = deck or load_deck()
+    return {card.id: card for card in off_cards}, {card.id: card for card in def_cards}
+
+def perform(game, action, off_cards, def_cards):
+    name = action[0]
+    if name == "play":
+        name, off_card_id, def_card_id, off_offset, def_offset = action
+        return game.play(Play.create(off_cards[off_card_id], def_cards[def_card_id], off_offset, def_offset))
+    return getattr(game, name)()
@@ -0,0 +1,81 @@
+from fourthand1.events import BlockedKick, FieldGoal, Interception, KickOff, KickOffReturn, OnSideKick, Punt, PuntReturn, SafetyPunt, compile_outcome_table
+
+
+# Each table is validated and compiled once, when the Ruleset is built. A
+# Ruleset is never modified afterwards, so any number of them can be used side
+# by side (even by games in different threads) without interfering.
+class Ruleset:
+    # Where the standard version of each table lives. The event classes build
+    # some of them on first use, so they're looked up when the first Ruleset
+    # is made rather than when this module is imported.
+    TABLE_SOURCES = {
+        "kickoff": (KickOff, "YDS"),
+        "kickoff_return": (KickOffReturn, "YDS"),
+        "onside_kick": (OnSideKick, "YDS"),
+        "blocked_kick": (BlockedKick, "YDS"),
+        "punt_in_bounds": (Punt, "IN_BOUNDS_YDS"),
+        "punt_out_of_bounds": (Punt, "OUT_OF_BOUNDS_YDS"),
+        "punt_return": (PuntReturn, "YDS"),
+        "safety_punt": (SafetyPunt, "YDS"),
+        "interception": (Interception, "YDS")
+    }
+
+    _standard_tables = None
+    _default = None
+
+    @staticmethod
+    def default():
+        if Ruleset._default is None:
+            Ruleset._default = Ruleset()
+        return Ruleset._default
+
+    @staticmethod
+    def standard_tables():
+        if Ruleset._standard_tables is None:
+            Ruleset._standard_tables = {name: getattr(event_cls, attr) for name, (event_cls, attr) in Ruleset.TABLE_SOURCES.items()}
+        return Ruleset._standard_tables
+
+    @staticmethod
+    def _validate_field_goal_chart(prob, blocked_roll):
+        def _valid_dice_range(dice_range):
+            return len(dice_range) in (1, 2) and 3 <= dice_range[0] <= dice_range[-1] <= 18
+
+        if not _valid_dice_range(blocked_roll):
+            raise ValueError(f"Invalid blocked field goal roll: {blocked_roll}")
+        for yd_range, dice_ranges in prob.items():
+            if not 0 <= yd_range[0] <= yd_range[1] <= 100:
+                raise ValueError(f"Invalid field goal yard line range: {yd_range}")
+            for dice_range in dice_ranges:
+                if not _valid_dice_range(dice_range):
+                    raise ValueError(f"Invalid field goal roll range: {dice_range}")
+
+    def __init__(self, field_goal_chart="standard", **tables):
+        unknown_tables = set(tables) - set(Ruleset.TABLE_SOURCES)
+        if unknown_tables:
+            raise ValueError(f"Unknown outcome tables: {', '.join(sorted(unknown_tables))}")
+
+        self.field_goal_chart = field_goal_chart
+        self.tables = {**Ruleset.standard_tables(), **tables}
+        for name, table in self.tables.items():
+            setattr(self, name, compile_outcome_table(table, self))
+
+        if isinstance(field_goal_chart, str):
+            if field_goal_chart not in FieldGoal.CHARTS:
+                raise ValueError(f"Unknown field goal chart: {field_goal_chart}")
+            self.field_goal = FieldGoal.compiled_chart(field_goal_chart)
+            self.field_goal_min_ydline = FieldGoal.MIN_YDLINES[field_goal_chart]
+        else:
+            prob, blocked_roll = field_goal_chart
+            Ruleset._validate_field_goal_chart(prob, blocked_roll)
+            self.field_goal = FieldGoal.compile_chart(prob, blocked_roll)
+            self.field_goal_min_ydline = min(min(ydlines) for ydlines in prob)
+
+    def variant(self, **changes):
+        tables = {name: table for name, table in self.tables.items() if Ruleset.standard_tables()[name] is not table}
+        return Ruleset(**{"field_goal_chart": self.field_goal_chart, **tables, **changes})
+
+    def field_goal_outcome(self, kick_from, roll_val):
+        if not 0 <= kick_from <= 100:
+            # Out of range.
+            return "missed"
+        return self.field_goal[kick_from][roll_val - 3]
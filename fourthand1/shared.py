@@ -0,0 +1,248 @@
+import array
+import json
+import os
+import struct
+import sys
+from collections import namedtuple
+from multiprocessing import resource_tracker, shared_memory
+
+from fourthand1.cards import load_deck
+from fourthand1.events import PlayResult
+from fourthand1.outcomes import SPECIAL_TEAMS, Effect, OutcomeTables
+from fourthand1.play.matchups import MatchupTable
+from fourthand1.rules import Ruleset
+
+
+MAGIC = b"4t1s"
+
+_HEADER = struct.Struct("<4sI")
+_CONTACT = {contact: code for code, contact in enumerate(PlayResult.CONTACTS)}
+
+# The typecode of each array in the block, in the order they're laid out.
+_ARRAYS = (
+    ("contacts", "b"),
+    ("contact_yds", "h"),
+    ("effect_ids", "i"),
+    ("probs", "d")
+)
+
+# Stands in for a card wherever only its id and name are needed.
+CardRef = namedtuple("CardRef", ("id", "name"))
+
+
+def _align(offset):
+    return (offset + 7) // 8 * 8
+
+def _add_dist(dist, effect_ids, probs, effects):
+    start = len(effect_ids)
+    for effect, prob in dist.items():
+        if effect not in effects:
+            effects[effect] = len(effects)
+        effect_ids.append(effects[effect])
+        probs.append(prob)
+    return [start, len(dist)]
+
+
+# A play whose contact was looked up in a SharedTables rather than worked out
+# from the card geometry. It can be passed to Game.play like any other Play.
+class ContactPlay:
+    def __init__(self, off_play, def_play, off_offset, def_offset, contact):
+        self.off_play = off_play
+        self.def_play = def_play
+        self.off_offset = off_offset
+        self.def_offset = def_offset
+        self.contact = contact
+
+    def run(self, from_ydline, rules=None):
+        contact, play_yds = self.contact
+        result, play_yds = PlayResult.create_result(contact, from_ydline, play_yds, rules or Ruleset.default())
+        return PlayResult(from_ydline, play_yds, result)
+
+
+class _SharedContacts:
+    def __init__(self, codes, yds):
+        self._codes = codes
+        self._yds = yds
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __getitem__(self, index):
+        contact = PlayResult.CONTACTS[self._codes[index]]
+        return contact, (None if contact == "touchdown" else self._yds[index])
+
+
+# Reads distributions out of the shared block, with the same interface as
+# OutcomeTables. Anything the parent didn't work out is computed (and cached)
+# locally instead.
+class _SharedOutcomes:
+    def __init__(self, tables, rules):
+        self._tables = tables
+        self.rules = rules
+        self._local = None
+
+    def _dist(self, index):
+        start, length = index
+        effect_ids = self._tables._arrays["effect_ids"][start:start + length]
+        probs = self._tables._arrays["probs"][start:start + length]
+        return {self._tables.effects[effect_id]: prob for effect_id, prob in zip(effect_ids, probs)}
+
+    def _fallback(self):
+        if self._local is None:
+            self._local = OutcomeTables.for_rules(self.rules)
+        return self._local
+
+    def special_teams(self, action, ydline=None):
+        phase, fixed_ydline = SPECIAL_TEAMS[action]
+        ydline = fixed_ydline if fixed_ydline is not None else ydline
+
+        index = self._tables._special_teams.get(f"{action}/{ydline}")
+        if index is None:
+            return self._fallback().special_teams(action, ydline)
+        return self._dist(index)
+
+    def play(self, contact, play_end):
+        if contact == "touchdown":
+            play_end = 100
+
+        index = self._tables._plays.get(f"{contact}/{play_end}")
+        if index is None:
+            return self._fallback().play(contact, play_end)
+        return self._dist(index)
+
+
+# The matchup contacts and outcome distributions, built once by a parent
+# process into a multiprocessing.shared_memory block, which workers attach to
+# by name. Workers then read straight out of the block: the contacts stand in
+# for the card geometry (they're all a play needs from it), so workers never
+# build Rects or outcome tables of their own, and however many there are,
+# there's one copy of the tables.
+#
+# The block starts with MAGIC and the length of a JSON header, followed by the
+# header itself and then, each 8-byte aligned, the arrays in _ARRAYS. The
+# header holds the card ids, the effects, the length of each array, and where
+# each distribution's slice of effect_ids and probs is.
+#
+# The parent owns the block, and has to unlink() it once the workers are done.
+# Requires Python 3.8 or later.
+class SharedTables:
+    @staticmethod
+    def create(matchups=None, rules=None, play_ends=range(-20, 121), special_teams_ydlines=range(0, 101)):
+        matchups = matchups or MatchupTable.create(*load_deck())
+        outcomes = OutcomeTables.for_rules(rules)
+
+        effects, effect_ids, probs = {}, [], []
+        special_teams = {}
+        for action, (phase, fixed_ydline) in SPECIAL_TEAMS.items():
+            for ydline in ((fixed_ydline, ) if fixed_ydline is not None else special_teams_ydlines):
+                special_teams[f"{action}/{ydline}"] = _add_dist(outcomes.special_teams(action, ydline), effect_ids, probs, effects)
+        plays = {}
+        for contact in PlayResult.CONTACTS:
+            for play_end in ((100, ) if contact == "touchdown" else play_ends):
+                plays[f"{contact}/{play_end}"] = _add_dist(outcomes.play(contact, play_end), effect_ids, probs, effects)
+
+        arrays = {
+            "contacts": array.array("b", [_CONTACT[contact] for contact, yds in matchups.contacts]),
+            "contact_yds": array.array("h", [yds or 0 for contact, yds in matchups.contacts]),
+            "effect_ids": array.array("i", effect_ids),
+            "probs": array.array("d", probs)
+        }
+
+        header = {
+            "off_cards": [[card.id, card.name] for card in matchups.off_cards],
+            "def_cards": [[card.id, card.name] for card in matchups.def_cards],
+            "effects": [list(effect[:5]) + [list(effect.types)] for effect in effects],
+            "special_teams": special_teams,
+            "plays": plays,
+            "arrays": {name: len(values) for name, values in arrays.items()}
+        }
+        header_bytes = json.dumps(header).encode("utf-8")
+
+        offset = _align(_HEADER.size + len(header_bytes))
+        starts = {}
+        for name, typecode in _ARRAYS:
+            starts[name] = offset
+            offset = _align(offset + len(arrays[name]) * arrays[name].itemsize)
+
+        shm = shared_memory.SharedMemory(create=True, size=offset)
+        _HEADER.pack_into(shm.buf, 0, MAGIC, len(header_bytes))
+        shm.buf[_HEADER.size:_HEADER.size + len(header_bytes)] = header_bytes
+        for name, typecode in _ARRAYS:
+            data = arrays[name].tobytes()
+            shm.buf[starts[name]:starts[name] + len(data)] = data
+
+        return SharedTables(shm, rules, owner=True)
+
+    @staticmethod
+    def attach(name, rules=None):
+        # Before Python 3.13, attaching registers the block with this
+        # process's resource tracker too, which unlinks it (with a leak
+        # warning) once the process exits, out from under the parent and
+        # every other worker (bpo-38119). Only the parent should unlink it.
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=name)
+            if os.name == "posix":
+                resource_tracker.unregister(shm._name, "shared_memory")
+        return SharedTables(shm, rules)
+
+    def __init__(self, shm, rules=None, owner=False):
+        self._shm = shm
+        self.owner = owner
+        self.rules = rules or Ruleset.default()
+
+        magic, header_len = _HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Shared memory block {shm.name} doesn't hold fourthand1 tables.")
+        header = json.loads(bytes(shm.buf[_HEADER.size:_HEADER.size + header_len]))
+
+        self._buf = shm.buf.toreadonly()
+        self._arrays = {}
+        offset = _align(_HEADER.size + header_len)
+        for name, typecode in _ARRAYS:
+            size = header["arrays"][name] * array.array(typecode).itemsize
+            self._arrays[name] = self._buf[offset:offset + size].cast(typecode)
+            offset = _align(offset + size)
+
+        self.effects = [Effect(*values[:5], tuple(values[5])) for values in header["effects"]]
+        self._special_teams = header["special_teams"]
+        self._plays = header["plays"]
+
+        self.matchups = MatchupTable(
+            [CardRef(*card) for card in header["off_cards"]],
+            [CardRef(*card) for card in header["def_cards"]],
+            _SharedContacts(self._arrays["contacts"], self._arrays["contact_yds"]))
+        self.outcomes = _SharedOutcomes(self, self.rules)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        if self.owner:
+            self.unlink()
+
+    def play(self, off_index, def_index, off_offset=0, def_offset=0):
+        contact = self.matchups.contacts[self.matchups.index(off_index, def_index, off_offset, def_offset)]
+        return ContactPlay(self.matchups.off_cards[off_index], self.matchups.def_cards[def_index], off_offset, def_offset, contact)
+
+    def close(self):
+        # Every view of the buffer has to go before the block can be closed.
+        for view in self._arrays.values():
+            view.release()
+        self._arrays = {}
+        self._buf.release()
+        self._shm.close()
+
+    def unlink(self):
+        if sys.version_info < (3, 13) and os.name == "posix":
+            # Workers sharing this process's resource tracker (as
+            # multiprocessing's do) took the block off its list when they
+            # attached. Put it back, so unlinking can take it off again.
+            resource_tracker.register(self._shm._name, "shared_memory")
+        self._shm.unlink()
@@ -0,0 +1,99 @@
+import gzip
+import json
+from collections import Counter, defaultdict
+
+
+# A shard only ever holds aggregate counts, so its size (and the cost of
+# merging it) depends on how many distinct event types, matchups and scores
+# were seen, never on how many games were simulated.
+class StatsShard:
+    VERSION = 1
+
+    @staticmethod
+    def load(filepath):
+        with gzip.open(filepath, "rt") as shard_file:
+            return StatsShard.fromjson(json.load(shard_file))
+
+    @staticmethod
+    def fromjson(shard_json):
+        if shard_json.get("version") != StatsShard.VERSION:
+            raise ValueError(f"Unsupported stats shard version: {shard_json.get('version')}")
+
+        shard = StatsShard()
+        shard.games = shard_json["games"]
+        for event_type, quarters in shard_json["events"].items():
+            shard.event_counts[event_type].update({int(quarter): count for quarter, count in quarters.items()})
+        for matchup, yds_counts in shard_json["matchups"].items():
+            shard.matchup_yds[matchup].update({int(yds): count for yds, count in yds_counts.items()})
+        shard.scores.update(shard_json["scores"])
+        return shard
+
+    @staticmethod
+    def merge(shards):
+        merged = StatsShard()
+        for shard in shards:
+            merged.update(shard)
+        return merged
+
+    @staticmethod
+    def matchup_key(off_card_id, def_card_id):
+        return f"{off_card_id}/{def_card_id}"
+
+    @staticmethod
+    def score_key(game):
+        return f"{game.team1.score}-{game.team2.score}"
+
+    def __init__(self):
+        self.games = 0
+        self.event_counts = defaultdict(Counter)
+        self.matchup_yds = defaultdict(Counter)
+        self.scores = Counter()
+
+    def record(self, events, quarter, matchup=None):
+        for event in events:
+            self.event_counts[event.TYPE][quarter] += 1
+
+        # The first event of a play is always the PlayResult, which holds the
+        # yardage gained at the point of contact.
+        if matchup and events:
+            self.matchup_yds[matchup][events[0].yds] += 1
+
+    def record_final(self, game):
+        self.games += 1
+        self.scores[StatsShard.score_key(game)] += 1
+
+    def perform(self, game, action, *args):
+        quarter = game.quarter
+        events = getattr(game, action)(*args) or []
+
+        matchup = None
+        if action == "play":
+            play = args[0]
+            matchup = StatsShard.matchup_key(play.off_play.id, play.def_play.id)
+        self.record(events, quarter, matchup)
+
+        if game.phase in ("gameover", "overtime"):
+            self.record_final(game)
+
+        return events
+
+    def update(self, shard):
+        self.games += shard.games
+        for event_type, quarters in shard.event_counts.items():
+            self.event_counts[event_type].update(quarters)
+        for matchup, yds_counts in shard.matchup_yds.items():
+            self.matchup_yds[matchup].update(yds_counts)
+        self.scores.update(shard.scores)
+
+    def asjson(self):
+        return {
+            "version": StatsShard.VERSION,
+            "games": self.games,
+            "events": {event_type: dict(quarters) for event_type, quarters in self.event_counts.items()},
+            "matchups": {matchup: dict(yds_counts) for matchup, yds_counts in self.matchup_yds.items()},
+            "scores": dict(self.scores)
+        }
+
+    def dump(self, filepath):
+        with gzip.open(filepath, "wt") as shard_file:
+            json.dump(self.asjson(), shard_file, separators=(",", ":"))
@@ -0,0 +1,280 @@
+import math
+import multiprocessing
+import queue
+import random
+from collections import namedtuple
+
+from fourthand1.cards import load_deck
+from fourthand1.game import Game
+
+
+Entrant = namedtuple("Entrant", ("name", "factory", "args"))
+
+# A game is scored 1 for a win, 0.5 for a tie (a game that goes to overtime)
+# and 0 for a loss.
+GameResult = namedtuple("GameResult", ("pair", "team1", "team2", "score1", "score2"))
+
+
+# The next action the policies (by id() of their team) take, in the form
+# Game.perform_many takes: (name, ) or ("play", off_card, def_card,
+# off_offset, def_offset).
+def next_action(game, policies, deck, rng):
+    off_cards, def_cards = deck
+    policy = policies[id(game.ball_carrier)]
+    action = policy.action(game, rng)
+    if action not in game.action_names:
+        raise ValueError(f"{game.ball_carrier.name} can't {action} during {game.phase}.")
+
+    if action == "play":
+        off_card, off_offset = policy.offense(game, off_cards, rng)
+        def_card, def_offset = policies[id(game.defense)].defense(game, def_cards, rng)
+        return ("play", off_card, def_card, off_offset, def_offset)
+    return (action, )
+
+def _perform(game, action):
+    return game.perform_many([action])
+
+# Plays a game out between two policies, passing the events of every action
+# to on_events, if given. Each action (the coin flip included) is done by
+# perform(game, action), which can be swapped out to measure them.
+def run_game(team1_name, policy1, team2_name, policy2, plays_per_quarter, seed, deck=None, dice=None, on_events=None, perform=_perform):
+    deck = deck or load_deck()
+    rng = random.Random(seed)
+
+    game = Game.create(team1_name, team2_name, plays_per_quarter, seed=rng.getrandbits(64), dice=dice)
+    policies = {id(game.team1): policy1, id(game.team2): policy2}
+
+    perform(game, ("coin_flip", ))
+    while game.phase not in ("overtime", "gameover"):
+        events = perform(game, next_action(game, policies, deck, rng))
+        if on_events:
+            on_events(events)
+    return game
+
+def play_game(team1_name, policy1, team2_name, policy2, plays_per_quarter, seed, deck=None, dice=None):
+    game = run_game(team1_name, policy1, team2_name, policy2, plays_per_quarter, seed, deck, dice)
+    return game.team1.score, game.team2.score
+
+
+# Worker processes load the deck once, and build each policy the first time
+# it plays.
+_worker_deck = None
+_worker_policies = {}
+
+def _init_worker():
+    global _worker_deck
+    _worker_deck = load_deck()
+
+def _worker_policy(entrant):
+    key = (entrant.name, entrant.factory)
+    if key not in _worker_policies:
+        _worker_policies[key] = entrant.factory(*entrant.args)
+    return _worker_policies[key]
+
+def _play_job(pair, entrant1, entrant2, plays_per_quarter, seed):
+    score1, score2 = play_game(
+        entrant1.name, _worker_policy(entrant1), entrant2.name, _worker_policy(entrant2), plays_per_quarter, seed, _worker_deck)
+    return GameResult(pair, entrant1.name, entrant2.name, score1, score2)
+
+
+class Standing:
+    def __init__(self, name, rating):
+        self.name = name
+        self.rating = rating
+        self.wins = 0
+        self.losses = 0
+        self.ties = 0
+
+    @property
+    def games(self):
+        return self.wins + self.losses + self.ties
+
+    @property
+    def points(self):
+        return self.wins + self.ties / 2
+
+    def asjson(self):
+        return {
+            "name": self.name,
+            "rating": round(self.rating, 1),
+            "wins": self.wins,
+            "losses": self.losses,
+            "ties": self.ties
+        }
+
+
+# Pits registered policies against each other, in round-robin or Swiss
+# pairings, running games in worker processes. Ratings (Elo) and standings
+# are updated with each result in the order the games were scheduled, not the
+# order they finish in, so a seeded tournament comes out the same every time
+# it's run with the same number of workers.
+#
+# A pairing plays between min_games and max_games games. Once min_games are
+# in, it stops as soon as the Wilson score interval (at the given z) of one
+# side's score no longer includes an even split, so clear mismatches are
+# settled in a handful of games and the games go where they're needed.
+#
+# Policies are built in each worker from their factory and args, so those need
+# to be picklable (a class defined at the top level of a module will do). With
+# workers=1, games are played in this process instead.
+class Tournament:
+    INITIAL_RATING = 1500
+
+    def __init__(self, plays_per_quarter=15, workers=None, seed=0, k_factor=16, z=1.96):
+        self.plays_per_quarter = plays_per_quarter
+        self.workers = workers or multiprocessing.cpu_count()
+        self.seed = seed
+        self.k_factor = k_factor
+        self.z = z
+
+        self.entrants = {}
+        self.standings = {}
+        self.results = []
+        self.on_result = None
+        self._played = set()
+
+    def register(self, name, factory, *args):
+        if name in self.entrants:
+            raise ValueError(f"There's already an entrant named {name}.")
+        self.entrants[name] = Entrant(name, factory, args)
+        self.standings[name] = Standing(name, Tournament.INITIAL_RATING)
+
+    def ranking(self):
+        return sorted(self.standings.values(), key=lambda standing: (-standing.points, -standing.rating, standing.name))
+
+    def _record(self, result):
+        self.results.append(result)
+        standing1, standing2 = self.standings[result.team1], self.standings[result.team2]
+
+        score = 1.0 if result.score1 > result.score2 else (0.0 if result.score1 < result.score2 else 0.5)
+        if score == 1.0:
+            standing1.wins += 1
+            standing2.losses += 1
+        elif score == 0.0:
+            standing1.losses += 1
+            standing2.wins += 1
+        else:
+            standing1.ties += 1
+            standing2.ties += 1
+
+        expected = 1 / (1 + 10 ** ((standing2.rating - standing1.rating) / 400))
+        change = self.k_factor * (score - expected)
+        standing1.rating += change
+        standing2.rating -= change
+
+        if self.on_result:
+            self.on_result(result, self)
+        return score
+
+    def _settled(self, total, games):
+        if games == 0:
+            return False
+
+        # Wilson score interval around the first entrant's mean score.
+        mean = total / games
+        z2 = self.z ** 2
+        center = (mean + z2 / (2 * games)) / (1 + z2 / games)
+        spread = self.z * math.sqrt(mean * (1 - mean) / games + z2 / (4 * games ** 2)) / (1 + z2 / games)
+        return center - spread > 0.5 or center + spread < 0.5
+
+    def play_pairings(self, pairs, max_games=100, min_games=10):
+        pairs = [tuple(pair) for pair in pairs]
+        totals = {pair: [0.0, 0] for pair in pairs}
+        scheduled = {pair: 0 for pair in pairs}
+        # Results by the order their games were scheduled in, as (job, result).
+        done = queue.Queue()
+        jobs = 0
+
+        pool = None
+        if self.workers > 1:
+            pool = multiprocessing.Pool(self.workers, initializer=_init_worker)
+        else:
+            _init_worker()
+
+        def _needs_games(pair):
+            total, games = totals[pair]
+            if scheduled[pair] >= max_games:
+                return False
+            if games >= min_games and self._settled(total, games):
+                return False
+            # Don't get too far ahead of the results, or there's nothing left
+            # to save when the pairing settles.
+            return scheduled[pair] < max(min_games, games + self.workers)
+
+        def _schedule(pair, pair_index, job_index):
+            game_index = scheduled[pair]
+            scheduled[pair] += 1
+
+            # Alternate which entrant is listed first.
+            names = pair if game_index % 2 == 0 else pair[::-1]
+            seed = hash((self.seed, pair_index, game_index, len(self._played))) & 0xffffffffffffffff
+            job = (pair_index, self.entrants[names[0]], self.entrants[names[1]], self.plays_per_quarter, seed)
+            put = lambda result: done.put((job_index, result))
+            if pool:
+                pool.apply_async(_play_job, job, callback=put, error_callback=put)
+            else:
+                put(_play_job(*job))
+
+        try:
+            recorded = 0
+            arrived = {}
+            while True:
+                # A game at a time for each pairing that needs one, so they
+                # all get a share of the workers.
+                scheduling = True
+                while scheduling and jobs - recorded < 2 * self.workers:
+                    scheduling = False
+                    for pair_index, pair in enumerate(pairs):
+                        if jobs - recorded < 2 * self.workers and _needs_games(pair):
+                            _schedule(pair, pair_index, jobs)
+                            jobs += 1
+                            scheduling = True
+                if jobs == recorded:
+                    break
+
+                # Games that finish early wait for the ones scheduled before
+                # them, so ratings and stopping don't depend on timing.
+                while recorded not in arrived:
+                    job_index, result = done.get()
+                    arrived[job_index] = result
+                result = arrived.pop(recorded)
+                recorded += 1
+                if isinstance(result, BaseException):
+                    raise result
+
+                pair = pairs[result.pair]
+                score = self._record(result)
+                totals[pair][0] += score if result.team1 == pair[0] else 1 - score
+                totals[pair][1] += 1
+        finally:
+            if pool:
+                pool.terminate()
+                pool.join()
+
+        self._played.update(frozenset(pair) for pair in pairs)
+        return {pair: tuple(totals[pair]) for pair in pairs}
+
+    def round_robin(self, max_games=100, min_games=10):
+        names = list(self.entrants)
+        pairs = [(names[i], names[j]) for i in range(len(names)) for j in range(i + 1, len(names))]
+        return self.play_pairings(pairs, max_games, min_games)
+
+    # Each round pairs entrants off in ranking order, avoiding rematches where
+    # it can. With an odd number of entrants, the lowest ranked entrant who
+    # hasn't had a bye sits the round out.
+    def swiss(self, rounds, max_games=20, min_games=4):
+        byes = set()
+        for round_num in range(rounds):
+            ranked = [standing.name for standing in self.ranking()]
+            if len(ranked) % 2:
+                bye = next((name for name in reversed(ranked) if name not in byes), ranked[-1])
+                byes.add(bye)
+                ranked.remove(bye)
+
+            pairs = []
+            while ranked:
+                first = ranked.pop(0)
+                opponent = next((name for name in ranked if frozenset((first, name)) not in self._played), ranked[0])
+                ranked.remove(opponent)
+                pairs.append((first, opponent))
+            self.play_pairings(pairs, max_games, min_games)
@@ -7,6 +7,7 @@ setup(
     author_email="mathfreak65@gmail.com",
     packages=find_packages(),
     package_data={"fourthand1": ["data/*", "data/cards/*", "data/cards/offense/*", "data/cards/defense/*"]},
-    python_requires=">=3.6"
+    python_requires=">=3.8",
+    extras_require={"batch": ["numpy"]}
 )
 